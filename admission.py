@@ -0,0 +1,149 @@
+"""Process-wide admission control for script runs.
+
+At most max_running script runs execute at once. A run that finds no free
+slot joins a bounded line of waiting sessions and blocks for up to wait
+seconds; if it is still not admitted it returns its place in line, so the
+app can show a "you're in line" view that polls until the session reaches
+the front. A session turned away because the line is full tries to join it
+again on each poll instead of rerunning the app. Protected sessions
+(respondents already taking the quiz) never join the line: they wait for the
+next free slot, ahead of everyone in it. Line entries that stop polling are
+dropped after stale seconds.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+
+
+class AdmissionPolicy(NamedTuple):
+    max_running: int = 0         # concurrent script runs, 0 = no admission control
+    max_waiting: int = 200       # sessions in line; beyond this they are told to retry
+    wait: float = 1.0            # seconds a run blocks for a slot before showing the line
+    poll_interval: float = 5.0   # seconds between a waiting session's checks
+    stale: float = 20.0          # drop line entries not seen for this long
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        wait = float(environ.get("INTHUM_ADMISSION_WAIT", cls._field_defaults["wait"]))
+        return cls(
+            max_running=int(environ.get("INTHUM_MAX_RUNNING", cls._field_defaults["max_running"])),
+            max_waiting=int(environ.get("INTHUM_MAX_WAITING", cls._field_defaults["max_waiting"])),
+            # A run must show the waiting view well before its entry turns stale.
+            wait=min(wait, cls._field_defaults["stale"] / 2),
+        )
+
+    @property
+    def enabled(self):
+        return self.max_running > 0
+
+
+class Admission(NamedTuple):
+    admitted: bool
+    position: Optional[int] = None  # 0-based place in line; None if the line was full
+    waited: float = 0.0             # seconds since the session joined the line
+
+
+class AdmissionController:
+    def __init__(self, policy):
+        self.policy = policy
+        self.running = 0
+        self._protected_waiting = 0
+        self._line = OrderedDict()  # session id -> [joined, last seen]
+        self._blocked = set()       # sessions in line whose run is blocked in acquire()
+        self._cond = threading.Condition()
+
+    @property
+    def waiting(self):
+        return len(self._line) + self._protected_waiting
+
+    def _free(self):
+        return self.policy.max_running - self.running - self._protected_waiting
+
+    def _position(self, session_id):
+        for position, key in enumerate(self._line):
+            if key == session_id:
+                return position
+        return None
+
+    def _expire(self, now):
+        cutoff = now - self.policy.stale
+        for session_id, (_, last_seen) in list(self._line.items()):
+            if last_seen < cutoff and session_id not in self._blocked:
+                del self._line[session_id]
+
+    def acquire(self, session_id, protected=False):
+        """Take a slot, or return the session's place in line if none came free."""
+        with self._cond:
+            now = time.monotonic()
+            if protected:
+                self._line.pop(session_id, None)
+                self._protected_waiting += 1
+                try:
+                    while self.running >= self.policy.max_running:
+                        self._cond.wait()
+                finally:
+                    self._protected_waiting -= 1
+                self.running += 1
+                return Admission(True, waited=time.monotonic() - now)
+
+            self._expire(now)
+            entry = self._line.get(session_id)
+            if entry is not None:
+                entry[1] = now
+            else:
+                if not self._line and self._free() > 0:
+                    self.running += 1
+                    return Admission(True)
+                if len(self._line) >= self.policy.max_waiting:
+                    return Admission(False)
+                entry = self._line[session_id] = [now, now]
+            deadline = now + self.policy.wait
+            self._blocked.add(session_id)
+            try:
+                while True:
+                    position = self._position(session_id)
+                    if position is None:
+                        # Another run of this session left the line; take its place at the back.
+                        self._line[session_id] = entry
+                        continue
+                    if position < self._free():
+                        del self._line[session_id]
+                        self.running += 1
+                        if self._free() > 0:
+                            self._cond.notify_all()
+                        return Admission(True, waited=time.monotonic() - entry[0])
+                    entry[1] = time.monotonic()
+                    remaining = deadline - entry[1]
+                    if remaining <= 0:
+                        return Admission(False, position, entry[1] - entry[0])
+                    self._cond.wait(remaining)
+            finally:
+                self._blocked.discard(session_id)
+
+    def release(self):
+        with self._cond:
+            self.running -= 1
+            self._cond.notify_all()
+
+    def poll(self, session_id):
+        """Keep a waiting session's place; returns (position, ready to be admitted).
+
+        A session not in line (turned away by a full line, or dropped as
+        stale) joins it if there is room. position is None while the line is
+        still full; the session should poll again later rather than rerun.
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._expire(now)
+            entry = self._line.get(session_id)
+            if entry is None:
+                if not self._line and self._free() > 0:
+                    return None, True
+                if len(self._line) >= self.policy.max_waiting:
+                    return None, False
+                entry = self._line[session_id] = [now, now]
+            entry[1] = now
+            position = self._position(session_id)
+            return position, position < self._free()
@@ -0,0 +1,360 @@
+"""Item-level psychometrics over large response archives.
+
+Responses are first converted into shards of memory-mapped columnar arrays,
+streamed from the app's SQLite database or from CSV, NDJSON or Parquet files
+in fixed-size chunks:
+
+    python analytics.py columnize data/responses.sqlite3 -o archive/2025
+    python analytics.py columnize panel.csv -o archive/panel --date-column date
+
+A shard is a directory with answers.u1 (rows x items, uint8 raw answers),
+days.i4 (int32 days since 1970-01-01, -1 if unknown) and meta.json. The
+report then makes a single pass over any number of shards:
+
+    python analytics.py report archive/* --period week --json report.json
+
+Every shard is split into row ranges that worker processes read through
+np.memmap a chunk at a time. Each range yields an Aggregate of integer
+counts, sums and cross-products, which add up exactly across ranges and
+shards. Item means and distributions, corrected item-total correlations,
+Cronbach's alpha and total-score histograms per period are all derived from
+the merged aggregate, so memory stays bounded by jobs x chunk size.
+"""
+import argparse
+import datetime
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import instruments
+from bulk_score import input_columns
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet",
+           ".sqlite3": "sqlite", ".sqlite": "sqlite", ".db": "sqlite"}
+UNKNOWN_DAY = -1
+PERIODS = ("day", "week", "month")
+
+
+class Aggregate:
+    """Mergeable sufficient statistics of complete responses to one instrument."""
+
+    def __init__(self, items, categories, min_score):
+        self.items = items
+        self.categories = categories
+        self.min_score = min_score
+        self.n = 0
+        self.incomplete = 0
+        self.counts = np.zeros((items, categories), dtype=np.int64)
+        self.sums = np.zeros(items, dtype=np.int64)
+        self.cross = np.zeros((items, items), dtype=np.int64)
+        self.by_day = {}  # day -> total-score histogram
+
+    def add(self, raw, days, reverse):
+        complete = np.all(raw > 0, axis=1)
+        self.incomplete += int((~complete).sum())
+        raw, days = raw[complete], days[complete]
+        if not len(raw):
+            return
+        keyed = np.where(reverse, self.categories + 1 - raw.astype(np.int64), raw.astype(np.int64))
+        self.n += len(keyed)
+        for item in range(self.items):
+            self.counts[item] += np.bincount(keyed[:, item] - 1, minlength=self.categories)
+        self.sums += keyed.sum(axis=0)
+        self.cross += keyed.T @ keyed
+
+        bins = self.items * (self.categories - 1) + 1
+        unique_days, day_index = np.unique(days, return_inverse=True)
+        histograms = np.zeros((len(unique_days), bins), dtype=np.int64)
+        np.add.at(histograms, (day_index, keyed.sum(axis=1) - self.min_score), 1)
+        for day, histogram in zip(unique_days.tolist(), histograms):
+            if day in self.by_day:
+                self.by_day[day] += histogram
+            else:
+                self.by_day[day] = histogram
+
+    def merge(self, other):
+        self.n += other.n
+        self.incomplete += other.incomplete
+        self.counts += other.counts
+        self.sums += other.sums
+        self.cross += other.cross
+        for day, histogram in other.by_day.items():
+            if day in self.by_day:
+                self.by_day[day] += histogram
+            else:
+                self.by_day[day] = histogram.copy()
+        return self
+
+    def covariance(self):
+        mean = self.sums / self.n
+        return self.cross / self.n - np.outer(mean, mean)
+
+    def alpha(self):
+        cov = self.covariance()
+        k = self.items
+        return k / (k - 1) * (1 - np.trace(cov) / cov.sum())
+
+    def item_total_correlations(self):
+        """Correlation of each item with the total of the other items."""
+        cov = self.covariance()
+        total_var = cov.sum()
+        item_var = np.diag(cov)
+        item_total_cov = cov.sum(axis=1)
+        rest_cov = item_total_cov - item_var
+        rest_var = total_var - 2 * item_total_cov + item_var
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return rest_cov / np.sqrt(item_var * rest_var)
+
+
+# -- columnize ---------------------------------------------------------------
+
+def _days(values):
+    # datetime64 or epoch seconds -> int32 days, unknown where missing.
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        days = values.astype("datetime64[D]").astype(np.int64)
+        return np.where(np.isnat(values), UNKNOWN_DAY, days).astype(np.int32)
+    seconds = values.astype(np.float64)
+    return np.where(np.isfinite(seconds), np.floor(seconds / 86400), UNKNOWN_DAY).astype(np.int32)
+
+
+def _sqlite_chunks(path, instrument, chunk_rows, **_):
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        cursor = conn.execute(
+            "SELECT submitted_at, answers FROM responses WHERE instrument = ? ORDER BY id", (instrument.id,)
+        )
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                return
+            answers = np.zeros((len(rows), len(instrument.items)), dtype=np.uint8)
+            for i, (_, encoded) in enumerate(rows):
+                values = json.loads(encoded)
+                if len(values) == len(instrument.items):
+                    answers[i] = values
+            yield answers, _days([submitted_at for submitted_at, _ in rows])
+    finally:
+        conn.close()
+
+
+def _frame_chunks(path, fmt, instrument, chunk_rows, columns, date_column):
+    usecols = list(columns) + ([date_column] if date_column else [])
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        frames = (batch.to_pandas() for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=usecols))
+    elif fmt == "csv":
+        frames = pd.read_csv(path, usecols=usecols, chunksize=chunk_rows)
+    else:
+        frames = pd.read_json(path, lines=True, chunksize=chunk_rows)
+    for frame in frames:
+        if fmt == "ndjson":
+            # Records may omit keys; a chunk without one reads as unanswered.
+            frame = frame.reindex(columns=usecols)
+        # Non-numeric answers become NaN and are written as unanswered.
+        values = frame[list(columns)].apply(pd.to_numeric, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = np.isfinite(values) & (values == np.floor(values)) & (values >= 1) & (values <= len(instrument.scale))
+        answers = np.where(valid, np.nan_to_num(values), 0).astype(np.uint8)
+        if date_column:
+            days = _days(pd.to_datetime(frame[date_column], errors="coerce").to_numpy())
+        else:
+            days = np.full(len(frame), UNKNOWN_DAY, dtype=np.int32)
+        yield answers, days
+
+
+def columnize(args):
+    try:
+        instrument = instruments.get(args.instrument)
+    except KeyError:
+        sys.exit(f"error: unknown instrument {args.instrument!r}; available: {', '.join(instruments.available())}")
+    except instruments.InvalidInstrument as exc:
+        sys.exit(f"error: {exc}")
+    fmt = args.format or FORMATS.get(os.path.splitext(args.input)[1].lower())
+    if fmt is None:
+        sys.exit(f"error: cannot infer the format of {args.input}; pass --format")
+    if fmt == "sqlite":
+        chunks = _sqlite_chunks(args.input, instrument, args.chunk_rows)
+    else:
+        columns = args.columns or list(instrument.columns)
+        if len(columns) != len(instrument.items):
+            sys.exit(f"error: expected {len(instrument.items)} item columns, got {len(columns)}")
+        try:
+            available = input_columns(args.input, fmt)
+        except (OSError, ValueError) as exc:
+            sys.exit(f"error: cannot read the columns of {args.input}: {exc}")
+        missing = [column for column in columns + [args.date_column] if column and column not in available]
+        if missing:
+            sys.exit(f"error: {args.input} has no column {', '.join(missing)}")
+        chunks = _frame_chunks(args.input, fmt, instrument, args.chunk_rows, columns, args.date_column)
+
+    os.makedirs(args.output, exist_ok=True)
+    rows = 0
+    with open(os.path.join(args.output, "answers.u1"), "wb") as answers_out, \
+            open(os.path.join(args.output, "days.i4"), "wb") as days_out:
+        for answers, days in chunks:
+            answers_out.write(np.ascontiguousarray(answers, dtype=np.uint8).tobytes())
+            days_out.write(np.ascontiguousarray(days, dtype="<i4").tobytes())
+            rows += len(answers)
+    with open(os.path.join(args.output, "meta.json"), "w") as fh:
+        json.dump({"instrument": instrument.id, "rows": rows, "items": len(instrument.items)}, fh)
+    print(f"wrote {rows:,} rows to {args.output}", file=sys.stderr)
+
+
+# -- report ------------------------------------------------------------------
+
+def open_shard(path):
+    with open(os.path.join(path, "meta.json")) as fh:
+        meta = json.load(fh)
+    rows, items = meta["rows"], meta["items"]
+    if rows == 0:
+        return meta, np.zeros((0, items), np.uint8), np.zeros(0, np.int32)
+    answers = np.memmap(os.path.join(path, "answers.u1"), dtype=np.uint8, mode="r", shape=(rows, items))
+    days = np.memmap(os.path.join(path, "days.i4"), dtype="<i4", mode="r", shape=(rows,))
+    return meta, answers, days
+
+
+def aggregate_range(task):
+    path, start, stop, chunk_rows = task
+    meta, answers, days = open_shard(path)
+    instrument = instruments.get(meta["instrument"])
+    reverse = np.array(instrument.reverse)
+    result = Aggregate(len(instrument.items), len(instrument.scale), instrument.min_score)
+    for offset in range(start, stop, chunk_rows):
+        end = min(offset + chunk_rows, stop)
+        result.add(np.asarray(answers[offset:end]), np.asarray(days[offset:end]), reverse)
+    return result
+
+
+def _period_key(day, period):
+    if day == UNKNOWN_DAY:
+        return "unknown"
+    date = datetime.date(1970, 1, 1) + datetime.timedelta(days=day)
+    if period == "week":
+        year, week, _ = date.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == "month":
+        return f"{date:%Y-%m}"
+    return date.isoformat()
+
+
+def build_report(total, instrument, period):
+    counts = total.counts
+    keyed_scores = np.arange(1, total.categories + 1)
+    means = counts @ keyed_scores / total.n
+    sds = np.sqrt(np.diag(total.covariance()))
+    correlations = total.item_total_correlations()
+    scores = np.arange(instrument.min_score, instrument.max_score + 1)
+
+    periods = {}
+    for day, histogram in sorted(total.by_day.items()):
+        key = _period_key(day, period)
+        periods[key] = periods.get(key, 0) + histogram
+
+    def summary(histogram):
+        n = int(histogram.sum())
+        mean = float(histogram @ scores / n)
+        sd = float(np.sqrt(histogram @ (scores - mean) ** 2 / n))
+        return {"n": n, "mean": mean, "sd": sd, "histogram": histogram.tolist()}
+
+    overall = sum(periods.values())
+    return {
+        "instrument": instrument.id,
+        "complete": total.n,
+        "incomplete": total.incomplete,
+        "alpha": float(total.alpha()),
+        "items": [
+            {
+                "column": column,
+                "mean": float(means[i]),
+                "sd": float(sds[i]),
+                "item_total_r": float(correlations[i]),
+                "distribution": (counts[i] / total.n).tolist(),
+            }
+            for i, column in enumerate(instrument.columns)
+        ],
+        "total": summary(overall),
+        "min_score": instrument.min_score,
+        "period": period,
+        "periods": {key: summary(histogram) for key, histogram in periods.items()},
+    }
+
+
+def print_report(report, out=sys.stdout):
+    print(
+        f"{report['instrument']}: {report['complete']:,} complete responses "
+        f"({report['incomplete']:,} incomplete or adaptive skipped)", file=out
+    )
+    print(f"Cronbach's alpha {report['alpha']:.3f}; total mean {report['total']['mean']:.2f} "
+          f"sd {report['total']['sd']:.2f}", file=out)
+    categories = len(report["items"][0]["distribution"])
+    print("item   mean    sd  r(it)  " + "  ".join(f"{k:>4}" for k in range(1, categories + 1)), file=out)
+    for item in report["items"]:
+        shares = "  ".join(f"{100 * share:3.0f}%" for share in item["distribution"])
+        print(f"{item['column']:<5}{item['mean']:5.2f} {item['sd']:5.2f} {item['item_total_r']:6.3f}  {shares}", file=out)
+    print(f"by {report['period']}:", file=out)
+    for key, stats in report["periods"].items():
+        print(f"  {key:<10} n={stats['n']:<8,} mean {stats['mean']:5.2f}  sd {stats['sd']:4.2f}", file=out)
+
+
+def report(args):
+    tasks = []
+    instrument_ids = set()
+    for path in args.shards:
+        meta, _, _ = open_shard(path)
+        instrument_ids.add(meta["instrument"])
+        step = max(args.chunk_rows, -(-meta["rows"] // (args.jobs * 4)))
+        tasks.extend((path, start, min(start + step, meta["rows"]), args.chunk_rows)
+                     for start in range(0, meta["rows"], step))
+    if len(instrument_ids) != 1:
+        sys.exit(f"error: shards must all hold one instrument, got {', '.join(sorted(instrument_ids)) or 'none'}")
+    instrument = instruments.get(instrument_ids.pop())
+
+    total = Aggregate(len(instrument.items), len(instrument.scale), instrument.min_score)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for partial in pool.map(aggregate_range, tasks):
+            total.merge(partial)
+    if total.n < 2:
+        sys.exit("error: fewer than two complete responses")
+
+    result = build_report(total, instrument, args.period)
+    print_report(result)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(result, fh, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Psychometric analytics over stored responses.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("columnize", help="convert responses into a memory-mappable shard")
+    convert.add_argument("input", help="responses SQLite database, CSV, NDJSON/JSONL or Parquet file")
+    convert.add_argument("-o", "--output", required=True, help="shard directory to write")
+    convert.add_argument("--format", choices=sorted(set(FORMATS.values())))
+    convert.add_argument("--instrument", default=instruments.DEFAULT_INSTRUMENT)
+    convert.add_argument("--columns", type=lambda value: value.split(","),
+                         help="comma-separated item columns in item order (default: q1..qN)")
+    convert.add_argument("--date-column", help="column with each response's date (files only)")
+    convert.add_argument("--chunk-rows", type=int, default=100_000)
+    convert.set_defaults(run=columnize)
+
+    summarize = commands.add_parser("report", help="item statistics over one or more shards")
+    summarize.add_argument("shards", nargs="+", help="shard directories")
+    summarize.add_argument("--period", choices=PERIODS, default="day")
+    summarize.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    summarize.add_argument("--chunk-rows", type=int, default=1_000_000)
+    summarize.add_argument("--json", dest="json_path", help="also write the full report as JSON")
+    summarize.set_defaults(run=report)
+
+    args = parser.parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,351 +1,436 @@
+import hashlib
 import os
+import secrets
 import time
-import plotly.graph_objects as go
-import numpy as np
+from array import array
 import streamlit.components.v1 as components
-from scipy.stats import norm
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import charts
+import instruments
+import landing
+import metrics
+import results
+import tokens
+from admission import AdmissionController, AdmissionPolicy
+from norms import ANY_COHORT, COHORT_DIMENSIONS, LiveNorm
+from profiling import ProfilePolicy, RerunProfiler
+from progress import Progress, ProgressStore
+from scoring import BOTTOM, TOP
+from sessions import EVICTED_KEY, EvictionPolicy, SessionTracker, start_sweeper
+from storage import ResponseWriter
+
+
+logo_path = "static/new_plab_logo.png"
+
+# "classic" reruns the whole script on every click, "fragment" reruns only the
+# question card, and "client" renders the whole questionnaire in the browser
+# and only talks to Python on submit. "adaptive" asks the most informative
+# item next and stops once the score's standard error is below
+# INTHUM_CAT_TARGET_SE (see cat.py); instruments without IRT parameters fall
+# back to classic. Fragment reruns count against INTHUM_MAX_RUNNING like full
+# runs.
+QUESTION_MODE = os.environ.get("INTHUM_QUESTION_MODE", "classic")
+CAT_TARGET_SE = float(os.environ.get("INTHUM_CAT_TARGET_SE", "0.55"))
+
+# Submitted answers are appended to this SQLite database by a background
+# writer; set INTHUM_RESPONSES_DB to an empty string to disable persistence.
+RESPONSES_DB = os.environ.get("INTHUM_RESPONSES_DB", "data/responses.sqlite3")
+
+# Opt-in norm computed from this app's own respondents. Until
+# INTHUM_NORM_MIN_SAMPLES submissions have been seen, results are compared
+# against the published norm.
+LIVE_NORMS = os.environ.get("INTHUM_LIVE_NORMS", "") == "1"
+LIVE_NORMS_CHECKPOINT = os.environ.get("INTHUM_NORMS_CHECKPOINT", "data/live_norms.json")
+NORM_MIN_SAMPLES = int(os.environ.get("INTHUM_NORM_MIN_SAMPLES", "200"))
+
+# Metrics are always recorded; set INTHUM_METRICS_PORT to serve them on
+# 127.0.0.1:<port>/metrics and/or INTHUM_METRICS_FILE to dump them to a file.
+METRICS_PORT = os.environ.get("INTHUM_METRICS_PORT", "")
+METRICS_FILE = os.environ.get("INTHUM_METRICS_FILE", "")
+ACTIVE_SESSION_WINDOW = 300
+
+# "plotly" sends the interactive figure; "svg" sends a static chart that is
+# pre-rendered for all 25 possible totals and needs no plotly.js.
+RESULTS_CHART = os.environ.get("INTHUM_RESULTS_CHART", "plotly")
+
+# Set INTHUM_PROGRESS_DB to checkpoint quiz progress to a SQLite database
+# shared by all worker processes (see deploy/run_workers.sh). Respondents then
+# carry a ?resume=<token> in the URL and can continue on any worker.
+PROGRESS_DB = os.environ.get("INTHUM_PROGRESS_DB", "")
+RESUME_PARAM = "resume"
+
+# Set INTHUM_MAX_RUNNING to cap concurrent script runs in this process. New
+# visitors beyond the cap queue for up to INTHUM_ADMISSION_WAIT seconds and
+# then see a waiting view (at most INTHUM_MAX_WAITING of them hold a place in
+# line); respondents past the intro page always get the next free slot. See
+# admission.AdmissionPolicy.
+ADMISSION_POLICY = AdmissionPolicy.from_env()
+
+# Submitting puts ?r=<token> in the URL, a signed encoding of the answers (see
+# tokens.py), so a reload or a shared link shows the results without session
+# state. The signing secret is INTHUM_RESULTS_SECRET, or else a random one
+# kept in INTHUM_RESULTS_SECRET_FILE and shared by the workers.
+RESULTS_PARAM = "r"
+RESULTS_SECRET = os.environ.get("INTHUM_RESULTS_SECRET", "")
+RESULTS_SECRET_FILE = os.environ.get("INTHUM_RESULTS_SECRET_FILE", "data/results_secret")
+
+# ?age=, ?education= and ?source= select a comparison cohort from the
+# instrument's cohorts file, if it has one (see cohorts.py). Cohorts with
+# fewer than INTHUM_COHORT_MIN_N cases fall back to a broader cohort.
+COHORT_PARAMS = COHORT_DIMENSIONS
+
+# Set INTHUM_PROFILE_RATE to profile that fraction of script runs; runs slower
+# than INTHUM_PROFILE_THRESHOLD_MS are saved to INTHUM_PROFILE_DIR (see
+# profiling.py).
+PROFILE_POLICY = ProfilePolicy.from_env()
+
+SCRIPT_RUN_SECONDS = metrics.histogram(
+    "inthum_script_run_seconds", "Time spent in main() per script run.", ["page"])
+SECTION_SECONDS = metrics.histogram(
+    "inthum_section_seconds", "Time spent in each page function and hot-path step.", ["section"])
+SUBMISSIONS = metrics.counter(
+    "inthum_submissions_total", "Completed questionnaires.")
+PAGE_TRANSITIONS = metrics.counter(
+    "inthum_page_transitions_total", "Page changes between script runs.", ["source", "target"])
+ACTIVE_SESSIONS = metrics.gauge(
+    "inthum_active_sessions", f"Sessions with a script run in the last {ACTIVE_SESSION_WINDOW} seconds.")
+RESIDENT_SESSIONS = metrics.gauge(
+    "inthum_resident_sessions", "Sessions tracked and not yet evicted.")
+SESSION_EVICTIONS = metrics.counter(
+    "inthum_session_evictions_total", "Sessions evicted by the idle-session policy.", ["reason"])
+RUNNING_SCRIPTS = metrics.gauge(
+    "inthum_admission_running", "Script runs holding an admission slot.")
+QUEUE_DEPTH = metrics.gauge(
+    "inthum_admission_queue_depth", "Sessions waiting for an admission slot.")
+ADMISSION_WAIT_SECONDS = metrics.histogram(
+    "inthum_admission_wait_seconds", "Time from joining the line to admission.", ["protected"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+RESULTS_VIEWS = metrics.counter(
+    "inthum_results_views_total", "Results page renders by results cache outcome.", ["cache"])
+PROFILES_SAVED = metrics.counter(
+    "inthum_profiles_saved_total", "Profiles of slow script runs saved to disk.", ["page"])
+ADMISSION_QUEUED = metrics.counter(
+    "inthum_admission_queued_total", "Script runs answered with the waiting view.", ["reason"])
+
+# Idle sessions are evicted after INTHUM_SESSION_TTL seconds (default 1800),
+# beyond INTHUM_MAX_SESSIONS resident sessions (least recently used first) or
+# while RSS is above INTHUM_MAX_RSS_MB; see sessions.EvictionPolicy.
+EVICTION_POLICY = EvictionPolicy.from_env()
+
+_questionnaire_component = components.declare_component(
+    "questionnaire",
+    path=os.path.join(os.path.dirname(os.path.abspath(__file__)), "frontend", "questionnaire"),
+)
+
+
+# -- Static assets --
+# CSS and the page script live in static/ and are served by Streamlit's static
+# file handler (server.enableStaticServing). The ?v= content hash changes the
+# URL whenever a file changes, and tornado answers versioned static URLs with
+# a long-lived Cache-Control header, so browsers fetch each file only once.
+# The hashes are cached because Streamlit re-executes this module on every rerun.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+
+@st.cache_resource(show_spinner=False)
+def static_url(name):
+    with open(os.path.join(STATIC_DIR, name), "rb") as fh:
+        digest = hashlib.sha256(fh.read()).hexdigest()[:12]
+    return f"app/static/{name}?v={digest}"
+
+
+STYLESHEET_URL = static_url("inthum.css")
+SCRIPT_URL = static_url("inthum.js")
+
+
+@SECTION_SECONDS.timed(section="page_assets")
+def page_assets(page, scroll_to_top=False):
+    # Each rerun only sends this small loader. It adds the stylesheet and
+    # script to the parent page the first time, tags <html> with the current
+    # page so the page-scoped rules apply, and optionally scrolls to the top.
+    components.html(f"""
+        <script>
+            var doc = window.parent.document;
+            function ensure(tag, id, attr, url) {{
+                var node = doc.getElementById(id);
+                if (!node) {{
+                    node = doc.createElement(tag);
+                    node.id = id;
+                    if (tag === 'link') {{
+                        node.rel = 'stylesheet';
+                    }}
+                    doc.head.appendChild(node);
+                }}
+                if (node.getAttribute(attr) !== url) {{
+                    node.setAttribute(attr, url);
+                }}
+                return node;
+            }}
+            doc.documentElement.setAttribute('data-inthum-page', '{page}');
+            ensure('link', 'inthum-css', 'href', '{STYLESHEET_URL}');
+            var script = ensure('script', 'inthum-js', 'src', '{SCRIPT_URL}');
+            if ({'true' if scroll_to_top else 'false'}) {{
+                if (window.parent.inthum) {{
+                    window.parent.inthum.scrollToTop();
+                }} else {{
+                    script.addEventListener('load', function () {{
+                        window.parent.inthum.scrollToTop();
+                    }});
+                }}
+            }}
+        </script>
+    """, height=0)
 
 
-logo_path = "new_plab_logo.png"
+@st.cache_resource(show_spinner=False)
+def get_response_writer():
+    # One writer thread per process, shared by every session.
+    if not RESPONSES_DB:
+        return None
+    return ResponseWriter(RESPONSES_DB)
 
 
-def scroll_to_top():
-    components.html("""
-        <script>
-            function doScroll() {
-                var container = null;
-                try {
-                    if (window.parent && window.parent.document) {
-                        container = window.parent.document.querySelector('.stMainBlockContainer');
-                    }
-                } catch (e) {
-                    container = document.querySelector('.stMainBlockContainer');
-                }
-                if (container) {
-                    // Use scrollIntoView with block: 'start', then force scroll to top as a fallback
-                    container.scrollIntoView({behavior: 'auto', block: 'start'});
-                    setTimeout(function() {
-                        if (window.parent && window.parent.scrollTo) {
-                            window.parent.scrollTo({ top: 0, left: 0, behavior: 'auto' });
-                        }
-                        if (window.scrollTo) {
-                            window.scrollTo({ top: 0, left: 0, behavior: 'auto' });
-                        }
-                    }, 10);
-                } else {
-                    if (window.parent && window.parent.scrollTo) {
-                        window.parent.scrollTo({ top: 0, left: 0, behavior: 'auto' });
-                    }
-                    if (window.scrollTo) {
-                        window.scrollTo({ top: 0, left: 0, behavior: 'auto' });
-                    }
-                }
-            }
-            if ('scrollRestoration' in history) {
-                history.scrollRestoration = 'manual';
-            }
-            setTimeout(doScroll, 10);
-        </script>
-    """, height=0)
+@st.cache_resource(show_spinner=False)
+def get_live_norm(instrument_id, min_score, max_score):
+    checkpoint = LIVE_NORMS_CHECKPOINT or None
+    if checkpoint and instrument_id != instruments.DEFAULT_INSTRUMENT:
+        root, ext = os.path.splitext(checkpoint)
+        checkpoint = f"{root}.{instrument_id}{ext}"
+    return LiveNorm(checkpoint, min_samples=NORM_MIN_SAMPLES, min_score=min_score, max_score=max_score)
 
-QUESTIONS = [
-    "I question my own opinions, positions, and viewpoints because they could be wrong.",
-    "I reconsider my opinions when presented with new evidence.",
-    "I recognize the value in opinions that are different from my own.",
-    "I accept that my beliefs and attitudes may be wrong.",
-    "In the face of conflicting evidence, I am open to changing my opinions.",
-    "I like finding out new information that differs from what I already think is true",
-]
 
+@st.cache_resource(show_spinner=False)
+def get_results_secret():
+    if RESULTS_SECRET:
+        return RESULTS_SECRET.encode()
+    return tokens.load_secret(RESULTS_SECRET_FILE)
 
-def reset_test():
-    for i in range(len(QUESTIONS)):
-        response_key = f"response_{i}"
-        if response_key in st.session_state:
-            del st.session_state[response_key]
-    
-    if "responses_temp" in st.session_state:
-        del st.session_state["responses_temp"]
-    
-    if "current_question_index" in st.session_state:
-        del st.session_state["current_question_index"]
 
-    for key in ['chat_history', 'responses', 'submitted_all', 'final_generated']:
-        if key in st.session_state:
-            st.session_state[key] = []
-    st.session_state.submitted_all = False
-    st.session_state.final_generated = False
+@st.cache_resource(show_spinner=False)
+def get_progress_store():
+    if not PROGRESS_DB:
+        return None
+    return ProgressStore(PROGRESS_DB)
 
-# -- Streamlit Application --
-def intro_page():
-    st.markdown("""
-    <style>
-    .likert-group button,
-    .force-active-button {
-        width: auto;
-        padding: 0.25rem 0.75rem;
-        font-weight: 500;
-        border-radius: 0.5rem;
-        text-align: center;
-        margin: 0 auto;
-        display: block;
-    }
-    .likert-group {
-      max-width: 800px;
-      margin: 0 auto;
-      gap: 0.1rem !important;
-    }
-    /* Reduce gap for stHorizontalBlock (Streamlit columns) on small screens and left-align buttons */
-    @media (max-width: 600px) {
-      .likert-group {
-        gap: 0.05rem !important;
-        justify-content: flex-start !important;
-      }
-      .stHorizontalBlock {
-        gap: 0.05rem !important;
-        justify-content: flex-start !important;
-      }
-      .stVerticalBlock {
-        gap: 0.6rem !important;
-      }
-      .likert-group button,
-      .force-active-button {
-        margin-top: 0.1rem !important;
-        margin-bottom: 0.1rem !important;
-        padding-top: 0.15rem !important;
-        padding-bottom: 0.15rem !important;
-        margin-left: 0 !important;
-        margin-right: auto !important;
-        display: block !important;
-      }
-      .likert-group .force-active-button {
-        margin-top: 0.1rem !important;
-        margin-bottom: 0.1rem !important;
-        margin-left: 0 !important;
-        margin-right: auto !important;
-        display: block !important;
-        /* Ensure active button stays left-aligned and same size as others */
-      }
-      .center-button {
-        margin-top: 0 !important;
-        margin-bottom: 0 !important;
-        justify-content: flex-start !important;
-      }
-      .center-button button {
-        margin-left: 0 !important;
-        margin-right: auto !important;
-      }
-      .stButton > button {
-        margin-top: 0 !important;
-        margin-bottom: 0 !important;
-        margin-left: 0 !important;
-        margin-right: auto !important;
-      }
-    }
-                
-    .force-active-button {
-        background-color: rgb(255, 75, 75) !important;
-        color: white !important;
-        border: 1px solid rgb(255, 75, 75) !important;
-        box-shadow: 0 0 0 0.1rem rgba(255, 75, 75, 0.6) !important;
-        cursor: default;
-        margin-top: 0.1rem !important;
-        margin-bottom: 0.1rem !important;
-        padding-top: 0.15rem !important;
-        padding-bottom: 0.15rem !important;
-        margin-left: 0 !important;
-        margin-right: auto !important;
-        display: block !important;
-                
-    }
-    .center-button {
-      display: flex !important;
-      justify-content: center !important;
-    }
-    .center-button button {
-      margin: 0 auto !important;
-    }
-    div[data-testid="stButton"] {
-        display: flex;
-        justify-content: center;
-    }
-    p:not(button p):not(.stAlertContainer p):not(.stAlertSuccess p):not(.stAlertInfo p):not(.stAlertError p) {
-      margin-bottom: 0.5rem !important;
-    }
-    li{
-      margin-top: 0 !important;
-      margin-bottom: 0 !important;
-    }
-    button[kind="primary"] {
-      background-color: #6e32ce !important;
-      color: white !important;
-      border-color: #6e32ce !important;
-    }
-    button[kind="primary"]:hover {
-      border-color: #5828A4 !important;
-      color: white !important;
-      background-color: #5828A4 !important;
-    }
-    button[kind="primary"]:active {
-      background-color: white !important;
-      color: #6e32ce !important;
-      border-color: #6e32ce !important;
-    }
-    
-    header{
-      display:none !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
 
-    st.html("""
-      <style>
-          .stMainBlockContainer {
-              max-width:50rem;
-              padding-top: 1rem !important;
-              padding-bottom: 1rem !important;
-          }
-      </style>
-      """
-    )
-    
-    st.title("Intellectual Humility Assessment")
-    st.write(
-        """
-        **Do you have an intellectually humble mindset? Use this quiz to find out!**
+def current_instrument():
+    # ?instrument=<id> selects instruments/<id>.json; unknown ids and malformed
+    # files fall back to the default scale.
+    try:
+        return instruments.get(st.query_params.get("instrument", instruments.DEFAULT_INSTRUMENT))
+    except (KeyError, instruments.InvalidInstrument):
+        return instruments.get(instruments.DEFAULT_INSTRUMENT)
 
-        **What is intellectual humility?**
-        - Being open to new ideas
-        - Being willing to reconsider your beliefs when presented with new information or perspectives
-        - Recognizing that you might not always have all the answers
-        - Acknowledging that your knowledge and understanding can have limitations
-        - Challenging your assumptions, biases, and level of certainty about something or someone
 
-        **Why should I care about intellectual humility?**
+def current_cohort(instrument):
+    """(cohort norms, cell) for the cohort in the URL, or None."""
+    key = tuple(st.query_params.get(name, ANY_COHORT) for name in COHORT_PARAMS)
+    if all(value == ANY_COHORT for value in key):
+        return None
+    # Imported here so that numpy stays off the startup path.
+    import cohorts
 
-        Research shows [intellectual humility](https://www.templeton.org/news/what-is-intellectual-humility) may enhance tolerance from other perspectives and promote inquiry.
+    try:
+        table = cohorts.get(instrument)
+    except cohorts.InvalidCohortTable:
+        return None
+    if table is None:
+        return None
+    cell = table.resolve(key)
+    return None if cell is None else (table, cell)
+
+
+def current_norm(instrument):
+    if LIVE_NORMS:
+        live = get_live_norm(instrument.id, instrument.min_score, instrument.max_score)
+        return live.current(instrument.norm)
+    return instrument.norm
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def prerender_results_charts(instrument_id, version, _norm, _construct):
+    charts.prerender(_norm, _construct, RESULTS_CHART)
+    return version
+
+
+@st.cache_resource(show_spinner=False)
+def start_metrics_exporter():
+    if METRICS_PORT:
+        metrics.serve(int(METRICS_PORT))
+    if METRICS_FILE:
+        metrics.dump_periodically(METRICS_FILE)
+    return True
+
+
+@st.cache_resource(show_spinner=False)
+def get_admission_controller():
+    if not ADMISSION_POLICY.enabled:
+        return None
+    return AdmissionController(ADMISSION_POLICY)
+
+
+@st.cache_resource(show_spinner=False)
+def get_profiler():
+    if not PROFILE_POLICY.enabled:
+        return None
+    return RerunProfiler(PROFILE_POLICY, on_save=lambda page: PROFILES_SAVED.inc(page=page))
+
+
+@st.cache_resource(show_spinner=False)
+def get_session_tracker():
+    tracker = SessionTracker()
+
+    def on_sweep(evicted):
+        for reason, count in evicted.items():
+            SESSION_EVICTIONS.inc(count, reason=reason)
+        ACTIVE_SESSIONS.set(tracker.active(ACTIVE_SESSION_WINDOW))
+        RESIDENT_SESSIONS.set(len(tracker))
+        store = get_progress_store()
+        if store is not None:
+            store.prune()
+
+    # The sweeper also refreshes the session gauges, so it runs even when no
+    # eviction limit is configured.
+    start_sweeper(tracker, EVICTION_POLICY, on_sweep=on_sweep)
+    return tracker
+
+
+def touch_session():
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        get_session_tracker().touch(ctx.session_id)
+
+
+def record_activity(page):
+    touch_session()
+    last_page = st.session_state.get("last_page")
+    if last_page is not None and last_page != page:
+        PAGE_TRANSITIONS.inc(source=last_page, target=page)
+    st.session_state.last_page = page
+
+
+# A respondent's whole quiz state is the instrument id, one small-int array
+# indexed like its items (0 = not answered yet) and current_question_index.
+def get_answers():
+    if "answers" not in st.session_state:
+        st.session_state.answers = array("B", bytes(len(current_instrument().items)))
+    return st.session_state.answers
+
+
+def sync_instrument(instrument):
+    # Switching instrument (or an edited file changing the item count)
+    # restarts the quiz.
+    answers = st.session_state.get("answers")
+    if st.session_state.get("instrument") != instrument.id or (
+        answers is not None and len(answers) != len(instrument.items)
+    ):
+        reset_test()
+        st.session_state.instrument = instrument.id
+
+
+def restore_progress():
+    """Resume a checkpointed quiz in a new session; True if one was found."""
+    store = get_progress_store()
+    token = st.query_params.get(RESUME_PARAM)
+    if store is None or token is None:
+        return False
+    saved = store.load(token)
+    if saved is None:
+        return False
+    st.session_state.instrument = saved.instrument
+    if saved.answers:
+        st.session_state.answers = array("B", saved.answers)
+        st.session_state.current_question_index = saved.question_index
+    st.session_state.current_page = saved.page
+    st.session_state.submitted_all = saved.page == "results"
+    return True
+
+
+def checkpoint_progress():
+    # Only respondents who have started the quiz get a token; from then on
+    # every run saves, so a reset is checkpointed too. A results URL carries
+    # no token (the ?r= token restores it), so whoever opens a shared link
+    # cannot load or overwrite the sharer's progress.
+    store = get_progress_store()
+    if store is None or RESULTS_PARAM in st.query_params:
+        return
+    token = st.query_params.get(RESUME_PARAM)
+    answers = st.session_state.get("answers")
+    if token is None:
+        if answers is None:
+            return
+        token = st.query_params[RESUME_PARAM] = secrets.token_urlsafe(12)
+    store.save(token, Progress(
+        st.session_state.get("instrument", instruments.DEFAULT_INSTRUMENT),
+        st.session_state.current_page,
+        st.session_state.get("current_question_index", 0),
+        b"" if answers is None else bytes(answers),
+    ))
 
-        **Instructions**
 
-        This quiz asks six questions to generate your intellectual humility score and will compare your score to the general public.
+def reset_test():
+    for key in ("answers", "current_question_index"):
+        if key in st.session_state:
+            del st.session_state[key]
+    st.session_state.submitted_all = False
 
-        *This quiz is based on the scale developed by [Leary et al.](https://pubmed.ncbi.nlm.nih.gov/28903672/) in their research on the features of intellectual humility. This quiz is currently experimental and was partially supported by the John Templeton Foundation. Please provide feedback and report any issues to [info@polarizationlab.com](mailto:info@polarizationlab.com).*
-        """
-    )
+# -- Streamlit Application --
+@SECTION_SECONDS.timed(section="intro_page")
+def intro_page():
+    st.title(landing.INTRO_TITLE)
+    st.write(landing.INTRO_MARKDOWN)
 
     st.markdown("<div style='margin-bottom:0.5rem;'></div>", unsafe_allow_html=True)
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
-        if st.button("Start Assessment", key="to_questions", use_container_width=True, type="primary"):
+        if st.button(landing.START_LABEL, key="to_questions", use_container_width=True, type="primary"):
             st.session_state.current_page = "questions"
             st.rerun()
-    
+    page_assets("intro")
 
 
 
 
+@SECTION_SECONDS.timed(section="questions_page")
 def questions_page():
-    st.markdown("""
-    <style>
-    .likert-group button,
-    .force-active-button {
-        display: inline-flex;
-        align-items: center;
-        justify-content: center;
-        font-weight: 400;
-        padding: 0.25rem 0.75rem;
-        border-radius: 0.5rem;
-        min-height: 2.5rem;
-        margin: 0px;
-        line-height: 1.6;
-        text-transform: none;
-        font-family: inherit;
-        color: inherit;
-        width: auto;
-        cursor: pointer;
-        user-select: none;
-        background-color: #fff;
-        border: 1px solid rgba(49, 51, 63, 0.2);
-        box-sizing: border-box;
-        text-align: left;
-        box-shadow: none;
-        transition: background 0.1s, border 0.1s;
-    }
-    .likert-group {
-      max-width: 480px;
-      margin: 0 auto;
-      display: flex;
-      flex-direction: column;
-      gap: 0.1rem;
-    }
-    
-
-    .force-active-button {
-        background-color: rgb(255, 75, 75) !important;
-        color: white !important;
-        border: 1px solid rgb(255, 75, 75) !important;
-        box-shadow: 0 0 0 0.1rem rgba(255, 75, 75, 0.6) !important;
-        cursor: default;
-    }
-    
-    .question-text {
-        font-weight: 600;
-        font-size: 1.2rem;
-        margin-bottom: 0.5rem;
-    }
-    
-    .progress-bar {
-        background-color: #f0f0f0;
-        border-radius: 10px;
-        height: 8px;
-        margin-bottom: 1.5rem;
-    }
-    
-    .progress-fill {
-        background-color: rgb(255, 75, 75);
-        height: 100%;
-        border-radius: 10px;
-        transition: width 0.3s ease;
-    }
-    header{
-      display:none !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-    st.html("""
-      <style>
-          .stMainBlockContainer {
-              max-width:50rem;
-              padding-top: 1rem !important;
-              padding-bottom: 1rem !important;
-          }
-      </style>
-      """)
+    if QUESTION_MODE == "client":
+        client_questions_page()
+        return
+    if QUESTION_MODE == "adaptive" and current_instrument().irt is not None:
+        adaptive_questions_page()
+        return
     
     # Initialize session state for question navigation
     if "current_question_index" not in st.session_state:
         st.session_state.current_question_index = 0
-    if "responses_temp" not in st.session_state:
-        st.session_state.responses_temp = {}
-    
-    # Initialize all response keys
-    for i in range(len(QUESTIONS)):
-        if f"response_{i}" not in st.session_state:
-            st.session_state[f"response_{i}"] = None
-    
+    get_answers()
+
+    if QUESTION_MODE == "fragment":
+        question_card_fragment()
+    else:
+        question_card()
+
+
+# Answer and Previous/Next clicks update state in on_click callbacks, which
+# run before the rerun the click triggers. The card then renders the new state
+# without an explicit st.rerun(), and in fragment mode that rerun covers only
+# the card. Leaving the page (back to the intro, submit) reruns the whole app.
+def select_answer(index, value):
+    get_answers()[index] = value
+
+
+def move_question(step):
+    st.session_state.current_question_index += step
+
+
+@SECTION_SECONDS.timed(section="question_card")
+def question_card():
+    instrument = current_instrument()
     current_index = st.session_state.current_question_index
-    total_questions = len(QUESTIONS)
-    current_question = QUESTIONS[current_index]
-    
-    likert_options = {
-        1: "Not at All",
-        2: "Not Well", 
-        3: "Somewhat Well",
-        4: "Well",
-        5: "Very Well"
-    }
+    total_questions = len(instrument.items)
+    current_question = instrument.items[current_index]
+    answers = get_answers()
     
     
     # Progress bar
@@ -356,22 +441,18 @@ def questions_page():
     </div>
     """, unsafe_allow_html=True)
     
-    st.write("### How well does the following statement apply to you?")
+    st.write(f"### {instrument.prompt}")
     
     # Display current question
     st.markdown(f"<div class='question-text'>{current_question}</div>", unsafe_allow_html=True)
     
     # Display answer options
     st.markdown('<div class = "likert-group">', unsafe_allow_html=True)
-    for j in range(1, 6):
-        label = likert_options[j]
+    for j, label in enumerate(instrument.scale, start=1):
         btn_key = f"btn_{current_index}_{j}"
-        is_selected = st.session_state[f"response_{current_index}"] == j
+        is_selected = answers[current_index] == j
         if not is_selected:
-            if st.button(label, key=btn_key):
-                st.session_state[f"response_{current_index}"] = j
-                st.session_state.responses_temp[current_question] = j
-                st.rerun()
+            st.button(label, key=btn_key, on_click=select_answer, args=(current_index, j))
         else:
             st.markdown(
                 f"<button class ='force-active-button'>{label}</button>",
@@ -390,11 +471,8 @@ def questions_page():
                 st.session_state.current_page = "intro"
                 st.rerun()
         with col2:
-            current_answer = st.session_state[f"response_{current_index}"]
-            if current_answer is not None:
-                if st.button("Next Question", key="next_question", use_container_width=True):
-                    st.session_state.current_question_index += 1
-                    st.rerun()
+            if answers[current_index]:
+                st.button("Next Question", key="next_question", use_container_width=True, on_click=move_question, args=(1,))
             else:
                 st.button("Next Question", key="next_question_disabled", use_container_width=True, disabled=True)
                 st.caption("Please select an answer to continue")
@@ -403,181 +481,262 @@ def questions_page():
         # Last question: Previous and Submit All Answers
         col1, col2 = st.columns([1, 1])
         with col1:
-            if st.button("Previous Question", key="prev_question", use_container_width=True):
-                st.session_state.current_question_index -= 1
-                st.rerun()
+            st.button("Previous Question", key="prev_question", use_container_width=True, on_click=move_question, args=(-1,))
         with col2:
-            current_answer = st.session_state[f"response_{current_index}"]
-            if current_answer is not None:
+            if answers[current_index]:
                 if st.button("Submit All Answers", key="submit_all", use_container_width=True):
-                    # Check if all questions are answered
-                    response_dict = {}
-                    for i, question in enumerate(QUESTIONS):
-                        response_dict[question] = st.session_state[f"response_{i}"]
-                    
-                    missing = [q for q, ans in response_dict.items() if ans is None]
-                    if missing:
-                        st.error("Please answer all questions before submitting.")
-                    else:
-                        st.session_state.responses = []
-                        for idx, (q, ans) in enumerate(response_dict.items()):
-                            st.session_state.responses.append({
-                                "question": q,
-                                "scale_answer": int(ans)
-                            })
-                        st.session_state.submitted_all = True
-                        st.session_state.current_page = "results"
-                        st.rerun()
+                    submit_answers()
             else:
                 st.button("Submit All Answers", key="submit_all_disabled", use_container_width=True, disabled=True)
     else:
         # Middle questions: Previous and Next
         col1, col2 = st.columns([1, 1])
         with col1:
-            if st.button("Previous Question", key="prev_question", use_container_width=True):
-                st.session_state.current_question_index -= 1
-                st.rerun()
+            st.button("Previous Question", key="prev_question", use_container_width=True, on_click=move_question, args=(-1,))
         with col2:
-            current_answer = st.session_state[f"response_{current_index}"]
-            if current_answer is not None:
-                if st.button("Next Question", key="next_question", use_container_width=True):
-                    st.session_state.current_question_index += 1
-                    st.rerun()
+            if answers[current_index]:
+                st.button("Next Question", key="next_question", use_container_width=True, on_click=move_question, args=(1,))
             else:
                 st.button("Next Question", key="next_question_disabled", use_container_width=True, disabled=True)
                 
     
-    scroll_to_top()
+    page_assets("questions", scroll_to_top=True)
+    # Fragment reruns of the card skip main(), so mark the session active and
+    # checkpoint here as well.
+    touch_session()
+    checkpoint_progress()
+
+
+@st.fragment
+def question_card_fragment():
+    # Likert and Previous/Next clicks rerun only this fragment, which skips
+    # main(), so those reruns take an admission slot of their own. The first
+    # run is part of a full run that already holds one.
+    controller = get_admission_controller()
+    ctx = get_script_run_ctx()
+    if controller is None or ctx is None or not ctx.fragment_ids_this_run:
+        question_card()
+        return
+    admit(controller, ctx.session_id, protected=True)
+    try:
+        question_card()
+    finally:
+        release(controller)
 
             
     
 
     
 
-def results_page():
-    st.markdown("""
-    <style>
-    .likert-group button,
-    .force-active-button {
-        width: auto;
-        padding: 0.25rem 0.75rem;
-        font-weight: 500;
-        border-radius: 0.5rem;
-        text-align: center;
-        margin: 0 auto;
-        display: block;
-    }
-    .force-active-button {
-        background-color: rgb(255, 75, 75) !important;
-        color: white !important;
-        border: 1px solid rgb(255, 75, 75) !important;
-        box-shadow: 0 0 0 0.1rem rgba(255, 75, 75, 0.6) !important;
-        cursor: default;
-    }
-    .center-button {
-      display: flex !important;
-      justify-content: center !important;
-    }
-    .center-button button {
-      margin: 0 auto !important;
-    }
-    div[data-testid="stButton"] {
-        display: flex;
-        justify-content: center;
-    }
-    p:not(button p):not(.stAlertContainer p):not(.stAlertSuccess p):not(.stAlertInfo p):not(.stAlertError p) {
-      margin-bottom: 0.5rem !important;
-    }
-                
-    header{
-      display:none !important;
-    }
-    </style>
+def record_submission(instrument, answers, total, adaptive=False):
+    writer = get_response_writer()
+    if writer is not None:
+        writer.submit(answers, instrument=instrument.id, total=total)
+    # Adaptive estimates shrink toward the mean, so they would narrow a live norm.
+    if LIVE_NORMS and not adaptive:
+        get_live_norm(instrument.id, instrument.min_score, instrument.max_score).add(total)
+    SUBMISSIONS.inc()
+    st.query_params[RESULTS_PARAM] = tokens.encode(instrument.id, answers, get_results_secret())
+    if RESUME_PARAM in st.query_params:
+        del st.query_params[RESUME_PARAM]
+    st.session_state.submitted_all = True
+    st.session_state.current_page = "results"
+
+
+def submit_answers():
+    # Check if all questions are answered
+    instrument = current_instrument()
+    answers = list(get_answers())
+    if 0 in answers:
+        st.error("Please answer all questions before submitting.")
+    else:
+        record_submission(instrument, answers, instrument.total(answers))
+        st.rerun()
+
+
+# Adaptive mode: an answer click also picks the next item (or finishes) in
+# its callback, so each item costs one rerun and there is no Next button.
+# Unasked items stay 0 in the answers array.
+def answer_adaptive(index, value):
+    import cat
+
+    instrument = current_instrument()
+    answers = get_answers()
+    answers[index] = value
+    item, estimate = cat.step(instrument, answers, CAT_TARGET_SE)
+    if item is None:
+        if 0 in answers:
+            record_submission(instrument, list(answers), scaled_estimate(instrument, estimate), adaptive=True)
+        else:
+            # Every item was asked: store the exact total the results page shows.
+            record_submission(instrument, list(answers), instrument.total(answers))
+    else:
+        st.session_state.current_question_index = item
+
+
+def scaled_estimate(instrument, estimate):
+    return min(max(round(estimate.total), instrument.min_score), instrument.max_score)
+
+
+def adaptive_questions_page():
+    import cat
+
+    instrument = current_instrument()
+    answers = get_answers()
+    if "current_question_index" not in st.session_state:
+        st.session_state.current_question_index = cat.next_item(instrument, answers)
+    adaptive_question_card(instrument, answers)
+
+
+@SECTION_SECONDS.timed(section="adaptive_card")
+def adaptive_question_card(instrument, answers):
+    current_index = st.session_state.current_question_index
+    asked = sum(1 for answer in answers if answer)
+
+    # The bar shows progress through the longest possible quiz.
+    progress_percent = ((asked + 1) / len(instrument.items)) * 100
+    st.markdown(f"""
+    <div class="progress-bar">
+        <div class="progress-fill" style="width: {progress_percent}%;"></div>
+    </div>
     """, unsafe_allow_html=True)
 
-    st.html("""
-      <style>
-          .stMainBlockContainer {
-              max-width:50rem;
-              padding-top: 1rem !important;
-              padding-bottom: 1rem !important;
-          }
-      </style>
-      """
-    )
-    if not st.session_state.get("submitted_all", False):
-        st.warning("You must answer all questions first.")
-        if st.button("Go to Questions", key="to_questions_from_results"):
-            st.session_state.current_page = "questions"
+    st.write(f"### {instrument.prompt}")
+    st.markdown(f"<div class='question-text'>{instrument.items[current_index]}</div>", unsafe_allow_html=True)
+
+    st.markdown('<div class = "likert-group">', unsafe_allow_html=True)
+    for j, label in enumerate(instrument.scale, start=1):
+        st.button(label, key=f"btn_{current_index}_{j}", on_click=answer_adaptive, args=(current_index, j))
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.caption("The quiz picks each next statement from your answers so far and ends as soon as it can place your score.")
+
+    st.markdown("---")
+    if asked == 0:
+        if st.button("Back to Introduction", key="back_intro", use_container_width=True):
+            st.session_state.current_page = "intro"
             st.rerun()
+
+    page_assets("questions", scroll_to_top=True)
+    checkpoint_progress()
+
+
+def client_questions_page():
+    # The component keeps answers and navigation in the browser and returns a
+    # single value when the respondent submits or goes back. Each attempt gets
+    # a fresh key so a value left over from a previous attempt is never replayed.
+    page_assets("questions")
+    instrument = current_instrument()
+    attempt = st.session_state.get("questionnaire_attempt", 0)
+    initial = [ans or None for ans in get_answers()]
+    event = _questionnaire_component(
+        questions=list(instrument.items),
+        options=list(instrument.scale),
+        prompt=instrument.prompt,
+        initial=initial,
+        key=f"questionnaire_{attempt}",
+        default=None,
+    )
+    if not event:
         return
-    scores = [resp["scale_answer"] for resp in st.session_state.responses]
-    total_score = sum(scores)
+
+    submitted = event.get("answers") or []
+    answers = get_answers()
+    for i in range(len(instrument.items)):
+        ans = submitted[i] if i < len(submitted) else None
+        answers[i] = int(ans) if instrument.is_answer(ans) else 0
+    st.session_state.questionnaire_attempt = attempt + 1
+
+    if event.get("action") == "back":
+        st.session_state.current_page = "intro"
+        st.rerun()
+    elif event.get("action") == "submit":
+        submit_answers()
+
+
+def shared_results():
+    """(instrument, answers) from a valid ?r= token in the URL, else None."""
+    token = st.query_params.get(RESULTS_PARAM)
+    if token is None:
+        return None
+    decoded = tokens.decode(token, get_results_secret())
+    if decoded is None:
+        return None
+    instrument_id, answers = decoded
+    try:
+        instrument = instruments.get(instrument_id)
+    except (KeyError, instruments.InvalidInstrument):
+        return None
+    if len(answers) != len(instrument.items) or not any(answers) or not all(
+        answer == 0 or instrument.is_answer(answer) for answer in answers
+    ):
+        return None
+    return instrument, answers
+
+
+def results_view(instrument, answers):
+    """(cached results view, comparison with the current norm)."""
+    # Only an adaptive quiz can be submitted with unasked items.
+    asked = None
+    if 0 in answers:
+        import cat
+
+        estimate = cat.estimate(instrument, answers)
+        total_score = scaled_estimate(instrument, estimate)
+        asked = estimate.asked
+    else:
+        total_score = instrument.total(answers)
+    norm, percentile = current_norm(instrument), None
+    cohort = current_cohort(instrument)
+    if cohort is not None:
+        table, cell = cohort
+        norm, percentile = table.norm(cell), table.percentile(cell, total_score)
+    key = results.view_key(instrument, total_score, norm, RESULTS_CHART, asked)
+    view = results.VIEWS.get(key)
+    if view is None:
+        RESULTS_VIEWS.inc(cache="miss")
+        view = results.build_view(instrument, total_score, norm, RESULTS_CHART, asked)
+        results.VIEWS.put(key, view)
+    else:
+        RESULTS_VIEWS.inc(cache="hit")
+    return view, results.compare(instrument, total_score, norm, percentile)
+
+
+@SECTION_SECONDS.timed(section="results_page")
+def results_page():
+    if st.session_state.get("submitted_all", False):
+        instrument, answers = current_instrument(), get_answers()
+    else:
+        shared = shared_results()
+        if shared is None:
+            st.warning("You must answer all questions first.")
+            if st.button("Go to Questions", key="to_questions_from_results"):
+                st.session_state.current_page = "questions"
+                st.rerun()
+            page_assets("results")
+            return
+        instrument, answers = shared
+    with SECTION_SECONDS.time(section="results_view"):
+        view, comparison = results_view(instrument, answers)
 
     st.markdown('<div id="scroll-anchor"></div>', unsafe_allow_html=True)
-    st.title("Results: Intellectual Humility Assessment")
-    st.write(f"### Your score is {total_score} out of {5 * len(scores)}")
+    st.title(f"Results: {instrument.title}")
+    st.write(view.headline)
+    if view.caption:
+        st.caption(view.caption)
 
     st.markdown("**How does your score compare to the average person?**")
-    if total_score >= 25:
+    if comparison.tier == TOP:
         st.success("Your score places you in the **top 25%** for intellectual humility. 💡")
-    elif total_score <= 20:
+    elif comparison.tier == BOTTOM:
         st.error("Your score is in the **bottom 25%**, suggesting low intellectual humility.")
     else:
         st.info("Your score is in the **middle range**. You may be intellectually humble in some situations more than others.")
-
-    st.write("""
-    The average score is based on the mean intellectual humility score of 22.64 reported by Deffler, Leary, and Hoyle (2016).  
-    """
-    )
-    mean_score = 22.64
-    std_dev = 3.98
-    x_vals_cut = np.linspace(6, 30, 500)
-    y_vals_cut = norm.pdf(x_vals_cut, loc=mean_score, scale=std_dev)
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=x_vals_cut,
-        y=y_vals_cut,
-        mode='lines',
-        line=dict(color='skyblue'),
-        fill='tozeroy',
-        name='',
-        hoverinfo='skip',
-        showlegend=False
-    ))
-    fig.add_trace(go.Scatter(
-        x=[mean_score, mean_score],
-        y=[0, norm.pdf(mean_score, loc=mean_score, scale=std_dev)],
-        mode='lines',
-        line=dict(color='red', dash='dash', width=3),
-        name='Population Average = 22.64',
-        hoverinfo='skip'
-    ))
-    fig.add_trace(go.Scatter(
-        x=[total_score, total_score],
-        y=[0, 0.1],
-        mode='lines',
-        line=dict(color='green', dash='dot', width=3),
-        name=f'Your Score = {total_score}',
-        hoverinfo='skip'
-    ))
-    fig.update_layout(
-        title='Estimated Distribution of Intellectual Humility Scores',
-        xaxis_title='Total Score',
-        yaxis_title='Distribution',
-        yaxis=dict(showticklabels=False),
-        xaxis=dict(range=[6, 30]),
-        template='simple_white',
-        showlegend=True,
-        legend=dict(
-            orientation='h',
-            yanchor='bottom',
-            xanchor='center',
-            y= -0.4,
-            x=0.5,
-          ),
-    )
-    st.plotly_chart(fig, use_container_width=True)
+    st.write(f"You scored higher than **{comparison.percentile:.0f}%** of people.")
+    st.write(comparison.norm_text)
+    if RESULTS_CHART == "svg":
+        st.html(view.chart)
+    else:
+        st.plotly_chart(view.chart, use_container_width=True)
     
 
     
@@ -592,28 +751,117 @@ def results_page():
     with col2:
         if st.button("Reset Test", key="reset_test", use_container_width=True):
             reset_test()
+            if RESULTS_PARAM in st.query_params:
+                del st.query_params[RESULTS_PARAM]
             st.session_state.current_page = "intro"
             st.rerun()
-    scroll_to_top()
+    page_assets("results", scroll_to_top=True)
     
 
 
+def admit(controller, session_id, protected=None):
+    # Respondents who have started the quiz (or resumed one) are protected so
+    # a burst of new visitors cannot stall them mid-questionnaire.
+    if protected is None:
+        protected = st.session_state.get("admitted", False) or st.session_state.current_page != "intro"
+    admission = controller.acquire(session_id, protected)
+    QUEUE_DEPTH.set(controller.waiting)
+    RUNNING_SCRIPTS.set(controller.running)
+    if admission.admitted:
+        st.session_state.admitted = True
+        if admission.waited:
+            ADMISSION_WAIT_SECONDS.observe(admission.waited, protected=protected)
+    else:
+        ADMISSION_QUEUED.inc(reason="full" if admission.position is None else "queued")
+    return admission
+
+
+def release(controller):
+    controller.release()
+    RUNNING_SCRIPTS.set(controller.running)
+    QUEUE_DEPTH.set(controller.waiting)
+
+
+def waiting_page(session_id):
+    # Deliberately light: no page assets or charts, and only the fragment
+    # below reruns while the session waits.
+    st.title("Intellectual Humility Assessment")
+    st.write("Lots of people are taking the quiz right now. It will start automatically as soon as there is room.")
+    waiting_status(session_id)
+
+
+@st.fragment(run_every=ADMISSION_POLICY.poll_interval)
+def waiting_status(session_id):
+    position, ready = get_admission_controller().poll(session_id)
+    if ready:
+        st.rerun()
+    if position is None:
+        # The line is full too; the next poll tries to join it again.
+        st.info("The line is full right now. You'll get a place in it as soon as one opens up.")
+    else:
+        st.info(f"You're number **{position + 1}** in line.")
+
+
+def render_page(restored):
+    evicted = st.session_state.pop(EVICTED_KEY, False)
+    if landing.START_PARAM in st.query_params:
+        # Arrived from the static landing page's Start button.
+        del st.query_params[landing.START_PARAM]
+        if st.session_state.current_page == "intro":
+            st.session_state.current_page = "questions"
+    elif st.session_state.current_page == "intro" and shared_results() is not None:
+        # A reloaded or shared results link; results_page() reads the token.
+        st.session_state.current_page = "results"
+    instrument = current_instrument()
+    sync_instrument(instrument)
+    if RESULTS_CHART == "svg":
+        norm = current_norm(instrument)
+        prerender_results_charts(instrument.id, norm.version, norm, instrument.construct)
+    if evicted and not restored:
+        st.info("You were away for a while, so the quiz has restarted.")
+    page = st.session_state.current_page
+    record_activity(page)
+    with SCRIPT_RUN_SECONDS.time(page=page):
+        if page == "intro":
+            intro_page()
+        elif page == "questions":
+            questions_page()
+        elif page == "results":
+            results_page()
+    checkpoint_progress()
+
+
 # -- Streamlit Application --
 def main():
+    # A valid results token decides what a new session shows, even next to a
+    # resume token (links shared before resume tokens were dropped from them).
+    restored = "current_page" not in st.session_state and shared_results() is None and restore_progress()
     if "submitted_all" not in st.session_state:
         st.session_state.submitted_all = False
-    if "final_generated" not in st.session_state:
-        st.session_state.final_generated = False
     if "current_page" not in st.session_state:
         st.session_state.current_page = "intro"
-    page = st.session_state.current_page
-    if page == "intro":
-        intro_page()
-    elif page == "questions":
-        questions_page()
-    elif page == "results":
-        results_page()
+    start_metrics_exporter()
+    controller = get_admission_controller()
+    ctx = get_script_run_ctx()
+    if controller is None or ctx is None:
+        render_page(restored)
+        return
+    admission = admit(controller, ctx.session_id)
+    if not admission.admitted:
+        waiting_page(ctx.session_id)
+        return
+    try:
+        render_page(restored)
+    finally:
+        release(controller)
 
     
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    profiler = get_profiler()
+    if profiler is None:
+        main()
+    else:
+        # Tagged with the page and question the run started on.
+        with profiler.sample(st.session_state.get("current_page", "intro"),
+                             st.session_state.get("current_question_index")):
+            main()
@@ -0,0 +1,78 @@
+"""Simulate adaptive testing against full-length administration.
+
+Respondents are drawn from the prior (standard normal theta) and answer
+according to the instrument's graded response model. For each target
+standard error this reports the mean number of items asked, the script runs
+per completed quiz (classic mode needs an answer and a Next/Submit click per
+item), how closely the adaptive estimate tracks the full-length total, and
+the cost of one cat.step() call:
+
+    python benchmarks/bench_adaptive.py --respondents 2000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cat  # noqa: E402
+import instruments  # noqa: E402
+
+
+def simulate(instrument, bank, rng, theta):
+    grid = int(np.abs(cat.THETA - theta).argmin())
+    probs = np.exp(bank.log_probs[:, grid, :])
+    keyed = [int(rng.choice(len(p), p=p / p.sum())) + 1 for p in probs]
+    flip = len(instrument.scale) + 1
+    return [flip - answer if reverse else answer for answer, reverse in zip(keyed, instrument.reverse)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--instrument", default=instruments.DEFAULT_INSTRUMENT)
+    parser.add_argument("--respondents", type=int, default=1000)
+    parser.add_argument("--target-se", type=float, nargs="+", default=[0.45, 0.5, 0.55, 0.6])
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    instrument = instruments.get(args.instrument)
+    bank = cat.item_bank(instrument.irt, len(instrument.scale))
+    rng = np.random.default_rng(args.seed)
+    people = [simulate(instrument, bank, rng, theta) for theta in rng.standard_normal(args.respondents)]
+    full = np.array([instrument.total(answers) for answers in people])
+    items = len(instrument.items)
+    print(f"full length: {items} items, {1 + 2 * items} script runs per quiz")
+
+    for target in args.target_se:
+        asked, estimates = [], []
+        for responses in people:
+            answers = [0] * items
+            while True:
+                item, estimate = cat.step(instrument, answers, target)
+                if item is None:
+                    break
+                answers[item] = responses[item]
+            asked.append(estimate.asked)
+            estimates.append(estimate.total)
+        asked = np.array(asked)
+        estimates = np.array(estimates)
+        print(
+            f"target SE {target:.2f}: {asked.mean():.2f} items, {1 + asked.mean():.2f} script runs, "
+            f"r = {np.corrcoef(estimates, full)[0, 1]:.3f} with the full total, "
+            f"mean abs error {np.abs(estimates - full).mean():.2f} points"
+        )
+
+    answers = [0] * items
+    answers[0] = 4
+    repeat = 2000
+    start = time.perf_counter()
+    for _ in range(repeat):
+        cat.step(instrument, answers, args.target_se[0])
+    print(f"cat.step: {(time.perf_counter() - start) / repeat * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
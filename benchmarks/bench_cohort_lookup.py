@@ -0,0 +1,108 @@
+"""Measure cohort norm loading and per-request lookup latency.
+
+Builds a synthetic cohorts file for the default instrument with
+ages x educations x sources fully specified cohorts (random sizes, so some
+fall back to a broader cohort), then times loading it and resolving random
+requests: the cohort lookup with fallback, the percentile and the norm used
+for the chart. For comparison it also times computing the percentile per
+request from the cohort's histogram, as norms.Norm.percentile does:
+
+    python benchmarks/bench_cohort_lookup.py --sources 100
+"""
+import argparse
+import csv
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cohorts  # noqa: E402
+import instruments  # noqa: E402
+from norms import Norm  # noqa: E402
+
+
+def write_cohorts(path, instrument, ages, educations, sources, rng):
+    scores = instrument.max_score - instrument.min_score + 1
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(list(cohorts.DIMENSIONS) + [str(total) for total in range(instrument.min_score, instrument.max_score + 1)])
+        for age in range(ages):
+            for education in range(educations):
+                for source in range(sources):
+                    center = rng.normal(0.7, 0.05) * (scores - 1)
+                    probs = np.exp(-0.5 * ((np.arange(scores) - center) / 3.5) ** 2)
+                    counts = rng.multinomial(int(rng.integers(10, 600)), probs / probs.sum())
+                    writer.writerow([f"a{age}", f"e{education}", f"s{source}"] + counts.tolist())
+
+
+def percentiles_us(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1e6, samples[int(len(samples) * 0.99)] * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ages", type=int, default=8)
+    parser.add_argument("--educations", type=int, default=6)
+    parser.add_argument("--sources", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    instrument = instruments.get()
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{instrument.id}.cohorts.csv")
+        write_cohorts(path, instrument, args.ages, args.educations, args.sources, rng)
+        start = time.perf_counter()
+        table = cohorts.load(path, instrument.min_score, instrument.max_score)
+        load_seconds = time.perf_counter() - start
+
+    leaves = args.ages * args.educations * args.sources
+    fallbacks = int(sum(1 for cell, resolved in enumerate(table.resolved) if resolved != cell))
+    print(f"{leaves:,} cohorts, {len(table.keys):,} cells with aggregates, {fallbacks:,} fall back; "
+          f"loaded in {load_seconds * 1000:.0f} ms, {table.percentiles.nbytes / 1024:.0f} KiB percentile array")
+
+    # Some requests name an age band the file does not have.
+    requests = [
+        (f"a{rng.integers(args.ages + (args.ages // 9 + 1))}", f"e{rng.integers(args.educations)}",
+         f"s{rng.integers(args.sources)}", int(rng.integers(instrument.min_score, instrument.max_score + 1)))
+        for _ in range(args.requests)
+    ]
+
+    timings = []
+    clock = time.perf_counter
+    for age, education, source, total in requests:
+        start = clock()
+        cell = table.resolve((age, education, source))
+        table.percentile(cell, total)
+        table.norm(cell)
+        timings.append(clock() - start)
+    median, p99 = percentiles_us(timings)
+    print(f"indexed lookup:            median {median:.2f} us, p99 {p99:.2f} us")
+
+    histograms = {key: tuple(table.counts[cell].tolist()) for key, cell in table.index.items()}
+
+    def from_histogram(key, total):
+        for candidate in cohorts.fallback_chain(key):
+            histogram = histograms.get(candidate)
+            if histogram is not None and sum(histogram) >= cohorts.MIN_N:
+                norm = Norm(0.0, 1.0, None, "cohort", histogram, instrument.min_score, instrument.max_score)
+                return norm.percentile(total)
+
+    timings = []
+    for age, education, source, total in requests[: args.requests // 10]:
+        start = clock()
+        from_histogram((age, education, source), total)
+        timings.append(clock() - start)
+    median, p99 = percentiles_us(timings)
+    print(f"percentile from histogram: median {median:.2f} us, p99 {p99:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
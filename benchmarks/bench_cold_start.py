@@ -0,0 +1,93 @@
+"""Measure cold-start to first-result time of a fresh server process.
+
+Each sample is a new Python process that boots like a server would (imports
+Streamlit, optionally runs serve.warm_up()) and then drives one respondent
+from the intro page to their results with AppTest:
+
+    python benchmarks/bench_cold_start.py --repeat 5
+
+Three scenarios are compared:
+
+  no-bytecode  empty bytecode cache (PYTHONPYCACHEPREFIX), no warm-up
+  bytecode     precompiled bytecode as in the image, no warm-up
+  warm         precompiled bytecode and serve.py's warm-up
+
+"ready" is the time from process start until the server would accept
+connections, "first result" the time the first respondent then spends
+waiting on script runs, and "total" their sum.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+QUESTION_COUNT = 6
+
+
+def child(warm):
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    from streamlit.testing.v1 import AppTest
+
+    if warm:
+        import serve
+
+        serve.warm_up()
+    ready = time.perf_counter()
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.run()
+    at.button(key="to_questions").click().run()
+    for index in range(QUESTION_COUNT):
+        at.button(key=f"btn_{index}_4").click().run()
+        at.button(key="next_question" if index < QUESTION_COUNT - 1 else "submit_all").click().run()
+    if at.exception:
+        raise SystemExit(at.exception[0].message)
+    done = time.perf_counter()
+    print(json.dumps({"ready_s": ready - start, "first_result_s": done - ready}))
+
+
+def sample(scenario):
+    env = dict(os.environ, INTHUM_RESPONSES_DB="", INTHUM_PROGRESS_DB="")
+    args = [sys.executable, os.path.abspath(__file__), "--child"]
+    if scenario == "warm":
+        args.append("--warm")
+    with tempfile.TemporaryDirectory() as pycache:
+        if scenario == "no-bytecode":
+            env["PYTHONPYCACHEPREFIX"] = pycache
+        start = time.perf_counter()
+        out = subprocess.run(args, env=env, cwd=ROOT, check=True, capture_output=True, text=True).stdout
+        elapsed = time.perf_counter() - start
+    result = json.loads(out.strip().splitlines()[-1])
+    # Interpreter start-up happens before the child can take its first timestamp.
+    result["ready_s"] += elapsed - result["ready_s"] - result["first_result_s"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--warm", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(args.warm)
+        return
+
+    for scenario in ("no-bytecode", "bytecode", "warm"):
+        samples = [sample(scenario) for _ in range(args.repeat)]
+        ready = statistics.median(s["ready_s"] for s in samples)
+        first = statistics.median(s["first_result_s"] for s in samples)
+        print(
+            f"{scenario:>11}: ready {ready:6.2f} s  first result {first:6.2f} s  "
+            f"total {ready + first:6.2f} s  (median of {args.repeat})"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Measure the cold-start import cost of app.py with ``python -X importtime``.
+
+Each run starts a fresh interpreter (with bytecode writing disabled so the
+numbers do not depend on a warm __pycache__), imports the app module and
+parses the importtime log from stderr. The median cumulative time and the
+slowest top-level packages are printed, and a JSON report can be written for
+CI to archive. ``--max-ms`` turns the benchmark into a gate:
+
+    python benchmarks/bench_import_time.py --runs 5 --json import_time.json --max-ms 800
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def run_once(module):
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        sys.exit(proc.stderr)
+    top_level = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if not match:
+            continue
+        cumulative_us = int(match.group(2))
+        depth = (len(match.group(3)) - 1) // 2
+        if depth == 0:
+            name = match.group(4).split(".")[0]
+            top_level[name] = top_level.get(name, 0) + cumulative_us
+            total_us += cumulative_us
+    return total_us, top_level
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="app")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="write a JSON report here")
+    parser.add_argument("--max-ms", type=float, help="fail if the median exceeds this")
+    args = parser.parse_args()
+
+    totals = []
+    packages = {}
+    for _ in range(args.runs):
+        total_us, top_level = run_once(args.module)
+        totals.append(total_us / 1000)
+        for name, us in top_level.items():
+            packages.setdefault(name, []).append(us / 1000)
+
+    median_ms = statistics.median(totals)
+    slowest = sorted(
+        ((name, statistics.median(ms)) for name, ms in packages.items()),
+        key=lambda item: item[1],
+        reverse=True,
+    )[: args.top]
+
+    print(f"import {args.module}: median {median_ms:.1f} ms over {args.runs} runs")
+    for name, ms in slowest:
+        print(f"  {name:<30} {ms:8.1f} ms")
+
+    heavy = [name for name in ("numpy", "scipy", "plotly", "pandas") if name in packages]
+    if heavy:
+        print(f"  note: imported at startup: {', '.join(heavy)}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(
+                {
+                    "module": args.module,
+                    "runs": totals,
+                    "median_ms": median_ms,
+                    "slowest": dict(slowest),
+                    "heavy_imports": heavy,
+                },
+                fh,
+                indent=2,
+            )
+
+    if args.max_ms is not None and median_ms > args.max_ms:
+        sys.exit(f"median import time {median_ms:.1f} ms exceeds budget of {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Per-click cost of the question flow: full-script rerun versus fragment rerun.
+
+In the classic flow every Likert or Next/Previous click re-executes the whole
+script (main() dispatch, the style injections, the question card and
+scroll_to_top()). In fragment mode the server only re-executes
+question_card(). AppTest always runs a whole script, so the fragment case is
+measured by running a script that contains just the question card, which is
+exactly what a fragment rerun executes.
+
+For each click the script execution time and the serialized size of the
+emitted elements (an approximation of ForwardMsg delta bytes) are recorded:
+
+    python benchmarks/bench_question_clicks.py --clicks 60
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from array import array
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+CARD_SCRIPT = f"""
+import sys
+sys.path.insert(0, {ROOT!r})
+import app
+app.question_card()
+"""
+
+
+def element_bytes(node):
+    total = 0
+    proto = getattr(node, "proto", None)
+    if proto is not None and hasattr(proto, "ByteSize"):
+        total += proto.ByteSize()
+    children = getattr(node, "children", None) or {}
+    for child in children.values():
+        total += element_bytes(child)
+    return total
+
+
+def answer_state(at, index, answer):
+    at.session_state.current_page = "questions"
+    at.session_state.current_question_index = index
+    at.session_state.answers = array("B", [answer if i <= index else 0 for i in range(6)])
+
+
+def measure(at, clicks):
+    timings = []
+    sizes = []
+    for n in range(clicks):
+        index = n % 5
+        answer_state(at, index, 3)
+        at.run()
+        # Alternate between a Likert click and a Next click.
+        key = f"btn_{index}_{1 + n % 2 * 4}" if n % 2 else "next_question"
+        start = time.perf_counter()
+        at.button(key=key).click().run()
+        timings.append((time.perf_counter() - start) * 1000)
+        sizes.append(element_bytes(at._tree))
+    return timings, sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clicks", type=int, default=30)
+    args = parser.parse_args()
+
+    full = AppTest.from_file(APP_PATH, default_timeout=30)
+    full.session_state.current_page = "questions"
+    full.run()
+
+    card = AppTest.from_string(CARD_SCRIPT, default_timeout=30)
+    answer_state(card, 0, 3)
+    card.run()
+
+    for name, at in (("full rerun", full), ("fragment", card)):
+        timings, sizes = measure(at, args.clicks)
+        print(
+            f"{name:>10}: median {statistics.median(timings):7.2f} ms/click  "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms  "
+            f"~{statistics.median(sizes):7.0f} bytes/click"
+        )
+
+
+if __name__ == "__main__":
+    main()
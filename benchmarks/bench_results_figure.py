@@ -0,0 +1,90 @@
+"""Compare cold and warm construction of the results-page figure.
+
+Also compares the Plotly figure with the pre-rendered SVG chart
+(INTHUM_RESULTS_CHART=svg) by render time and payload size. Run from the
+repository root:
+
+    python benchmarks/bench_results_figure.py --repeat 200
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import charts  # noqa: E402
+from norms import Norm  # noqa: E402
+
+MEAN_SCORE = 22.64
+STD_DEV = 3.98
+
+
+def time_call(fn, repeat):
+    samples = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def cold(i):
+    charts._base_figure.cache_clear()
+    charts._figure.cache_clear()
+    charts.results_figure(6 + i % 25, NORM)
+
+
+def copy_only(i):
+    # Base figure cached, stamped figure rebuilt: the cost of the first
+    # respondent with a given total.
+    charts._figure.cache_clear()
+    charts.results_figure(6 + i % 25, NORM)
+
+
+def warm(i):
+    charts.results_figure(6 + i % 25, NORM)
+
+
+def svg_cold(i):
+    charts._render.cache_clear()
+    charts.results_svg(6 + i % 25, NORM)
+
+
+def svg_warm(i):
+    charts.results_svg(6 + i % 25, NORM)
+
+
+NORM = Norm(MEAN_SCORE, STD_DEV)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    # Prime imports and plotly's validators so the first cold sample is fair.
+    cold(0)
+    for name, fn in (("cold", cold), ("copy", copy_only), ("warm", warm),
+                     ("svg cold", svg_cold), ("svg warm", svg_warm)):
+        if name.endswith("warm"):
+            # What serve.py's warm-up leaves behind: every total cached.
+            charts.prerender(NORM, kind="svg" if name.startswith("svg") else "plotly")
+        samples = time_call(fn, args.repeat)
+        print(
+            f"{name:>8}: median {statistics.median(samples):7.3f} ms  "
+            f"min {min(samples):7.3f} ms  max {max(samples):7.3f} ms"
+        )
+
+    # What each mode sends over the websocket for one results page.
+    figure_json = charts.results_figure(22, NORM).to_json()
+    svg = charts.results_svg(22, NORM)
+    print(
+        f"payload: plotly {len(figure_json.encode()) / 1024:6.1f} KiB  "
+        f"svg {len(svg.encode()) / 1024:6.1f} KiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
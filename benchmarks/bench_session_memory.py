@@ -0,0 +1,50 @@
+"""Per-session memory held in st.session_state after a completed quiz.
+
+Runs one respondent through the whole flow with AppTest, then measures the
+deep size of every value left in session state (user keys and widget
+values), the number of keys, and the pickled size as a rough proxy for
+what a session store would have to hold:
+
+    python benchmarks/bench_session_memory.py
+"""
+import os
+import pickle
+import sys
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def deep_size(obj, seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    return size
+
+
+def main():
+    os.environ.setdefault("INTHUM_RESPONSES_DB", "")
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=30)
+    at.run()
+    at.button(key="to_questions").click().run()
+    for index in range(6):
+        at.button(key=f"btn_{index}_4").click().run()
+        at.button(key="next_question" if index < 5 else "submit_all").click().run()
+
+    state = at.session_state._state.filtered_state
+    user_state = {k: v for k, v in state.items() if not k.startswith(("btn_", "FormSubmitter"))}
+    print(f"keys in session state:   {len(state)} ({len(user_state)} set by the app)")
+    print(f"deep size, all keys:     {deep_size(state):,} bytes")
+    print(f"deep size, app keys:     {deep_size(user_state):,} bytes")
+    print(f"pickled app keys:        {len(pickle.dumps(user_state)):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
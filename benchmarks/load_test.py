@@ -0,0 +1,212 @@
+"""Headless multi-session load test of the full quiz flow.
+
+Drives N simulated respondents through intro -> six questions -> results
+with streamlit.testing.v1.AppTest, keeping up to --concurrency sessions open
+at once in one process (as a single `streamlit run` container would) and
+interleaving their clicks. AppTest cannot execute scripts from several
+threads at once, so runs are serialized; that matches how little a single
+Streamlit process parallelizes pure-Python script runs under the GIL. Every
+script run is timed and attributed to the page it rendered; per-page
+p50/p95/p99, throughput and peak RSS are printed and written as JSON:
+
+    python benchmarks/load_test.py --sessions 200 --concurrency 16 --json load.json
+
+AppTest always executes the whole script, so --mode fragment measures the
+same per-click work as classic mode; use bench_question_clicks.py for the
+fragment rerun cost.
+
+Pass a previous report with --baseline to fail when any page's p95 regresses
+by more than --tolerance (default 20%).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import sys
+import threading
+import time
+from collections import defaultdict, deque
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+QUESTION_COUNT = 6
+
+
+def current_rss_kb():
+    with open("/proc/self/statm") as fh:
+        pages = int(fh.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, interval=0.05):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            self.peak_kb = max(self.peak_kb, current_rss_kb())
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+        self.peak_kb = max(self.peak_kb, current_rss_kb())
+
+
+def timed_run(at, samples, page, action):
+    start = time.perf_counter()
+    at.run()
+    samples.append((page, action, (time.perf_counter() - start) * 1000))
+    if at.exception:
+        raise RuntimeError(f"{page}/{action}: {at.exception[0].message}")
+
+
+def respondent(seed, samples, timeout):
+    # A generator that performs one script run per step, so many sessions can
+    # be kept open and advanced in turn.
+    rng = random.Random(seed)
+    at = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    timed_run(at, samples, "intro", "load")
+    yield
+
+    at.button(key="to_questions").click()
+    timed_run(at, samples, "questions", "start")
+    yield
+    for index in range(QUESTION_COUNT):
+        at.button(key=f"btn_{index}_{rng.randint(1, 5)}").click()
+        timed_run(at, samples, "questions", "answer")
+        yield
+        if index < QUESTION_COUNT - 1:
+            at.button(key="next_question").click()
+            timed_run(at, samples, "questions", "next")
+            yield
+    at.button(key="submit_all").click()
+    timed_run(at, samples, "results", "submit")
+
+
+def drive(sessions, concurrency, timeout):
+    samples = []
+    pending = iter(range(sessions))
+    active = deque()
+    while True:
+        while len(active) < concurrency:
+            seed = next(pending, None)
+            if seed is None:
+                break
+            active.append(respondent(seed, samples, timeout))
+        if not active:
+            return samples
+        session = active.popleft()
+        try:
+            next(session)
+        except StopIteration:
+            continue
+        active.append(session)
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(values):
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "mean_ms": statistics.fmean(values),
+        "p50_ms": percentile(values, 50),
+        "p95_ms": percentile(values, 95),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1],
+    }
+
+
+def compare(report, baseline_path, tolerance):
+    with open(baseline_path) as fh:
+        baseline = json.load(fh)
+    failures = []
+    for page, stats in report["pages"].items():
+        previous = baseline.get("pages", {}).get(page)
+        if previous and stats["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            failures.append(f"{page}: p95 {stats['p95_ms']:.1f} ms vs baseline {previous['p95_ms']:.1f} ms")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["classic", "fragment"], help="INTHUM_QUESTION_MODE to test")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-run AppTest timeout in seconds")
+    parser.add_argument("--json", dest="json_path", help="write the report here")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    if args.mode:
+        os.environ["INTHUM_QUESTION_MODE"] = args.mode
+    # Keep load-test submissions out of the real response database.
+    os.environ.setdefault("INTHUM_RESPONSES_DB", "")
+
+    # One untimed session warms imports and process-wide caches.
+    drive(1, 1, args.timeout)
+
+    sampler = RssSampler()
+    sampler.start()
+    start = time.perf_counter()
+    samples = drive(args.sessions, args.concurrency, args.timeout)
+    elapsed = time.perf_counter() - start
+    sampler.stop()
+
+    by_page = defaultdict(list)
+    by_action = defaultdict(list)
+    for page, action, ms in samples:
+        by_page[page].append(ms)
+        by_action[action].append(ms)
+
+    report = {
+        "sessions": args.sessions,
+        "concurrency": args.concurrency,
+        "mode": os.environ.get("INTHUM_QUESTION_MODE", "classic"),
+        "elapsed_s": elapsed,
+        "sessions_per_s": args.sessions / elapsed,
+        "script_runs": len(samples),
+        "peak_rss_kb": sampler.peak_kb,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        "python": platform.python_version(),
+        "pages": {page: summarize(values) for page, values in by_page.items()},
+        "actions": {action: summarize(values) for action, values in by_action.items()},
+    }
+
+    print(
+        f"{args.sessions} sessions x {args.concurrency} concurrent in {elapsed:.1f} s "
+        f"({report['sessions_per_s']:.1f} sessions/s), peak RSS {sampler.peak_kb / 1024:.0f} MiB"
+    )
+    for page, stats in report["pages"].items():
+        print(
+            f"  {page:<10} n={stats['count']:<6} p50 {stats['p50_ms']:7.1f} ms  "
+            f"p95 {stats['p95_ms']:7.1f} ms  p99 {stats['p99_ms']:7.1f} ms"
+        )
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(report, fh, indent=2)
+
+    if args.baseline:
+        failures = compare(report, args.baseline, args.tolerance)
+        if failures:
+            sys.exit("performance regression:\n  " + "\n  ".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""Score large response files outside the web app.
+
+Reads CSV, NDJSON or Parquet files with one respondent per row and the
+instrument's items in columns q1..qN (six for the default ihs6 scale), and
+writes a CSV with each respondent's total, percentile against the
+instrument's published norm and tier:
+
+    python bulk_score.py panel.csv -o scores.csv --id-column respondent_id
+
+The input is split into byte ranges (CSV/NDJSON) or row groups (Parquet)
+that are scored in parallel by a process pool. Each worker reads its share in
+fixed-size chunks, validates and scores them with NumPy and streams the rows
+to its own part file. The parts are then concatenated in input order, so
+memory stays bounded by jobs x chunk size however large the file is.
+"""
+import argparse
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+import instruments
+from scoring import BOTTOM, MIDDLE, TOP
+
+FORMATS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson", ".parquet": "parquet"}
+
+
+class Task(NamedTuple):
+    path: str
+    fmt: str
+    instrument: instruments.Instrument
+    part_path: str
+    columns: tuple
+    id_column: Optional[str]
+    chunk_rows: int
+    strict: bool
+    start: int = 0
+    end: int = 0
+    header: bytes = b""
+    row_group: int = 0
+
+
+class InvalidResponses(ValueError):
+    pass
+
+
+def score_array(values, instrument):
+    """Score an (n, items) array of raw answers to instrument.
+
+    Returns (totals, valid) where rows with a missing, non-integer or
+    out-of-range answer are marked invalid and get a total of 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    points = len(instrument.scale)
+    valid = np.all(np.isfinite(values) & (values == np.floor(values)) & (values >= 1) & (values <= points), axis=1)
+    values = np.where(np.array(instrument.reverse), points + 1 - values, values)
+    totals = np.where(valid, np.nan_to_num(values).sum(axis=1), 0).astype(np.int64)
+    return totals, valid
+
+
+def _percentile_lookup(instrument):
+    table = instrument.table
+    percentiles = np.array(table.percentiles)
+    totals = range(instrument.min_score, instrument.max_score + 1)
+    tiers = np.array([table.tier(total) for total in totals], dtype=object)
+    return percentiles, tiers
+
+
+def _empty_histogram(instrument):
+    return np.zeros(instrument.max_score - instrument.min_score + 1, dtype=np.int64)
+
+
+def _score_frame(frame, task, out, stats, lookup, row_offset):
+    missing = [column for column in task.columns if column not in frame.columns]
+    if missing:
+        raise InvalidResponses(f"{task.path}: missing item columns {', '.join(missing)}")
+    if task.id_column and task.id_column not in frame.columns:
+        raise InvalidResponses(f"{task.path}: missing id column {task.id_column}")
+    instrument = task.instrument
+    # Non-numeric answers become NaN, so their rows are invalid like blank ones.
+    values = frame[list(task.columns)].apply(pd.to_numeric, errors="coerce")
+    totals, valid = score_array(values.to_numpy(dtype=np.float64, na_value=np.nan), instrument)
+    if task.strict and not valid.all():
+        bad = int(np.argmin(valid))
+        raise InvalidResponses(f"{task.path}: invalid answers in row {row_offset + bad + 1} of this part")
+
+    percentiles, tiers = lookup
+    index = np.clip(totals - instrument.min_score, 0, instrument.max_score - instrument.min_score)
+    result = pd.DataFrame({
+        "total": pd.array(np.where(valid, totals, 0), dtype="Int64"),
+        "percentile": np.round(percentiles[index], 1),
+        "tier": tiers[index],
+    })
+    result.loc[~valid, ["total", "percentile", "tier"]] = None
+    if task.id_column:
+        result.insert(0, task.id_column, frame[task.id_column].to_numpy())
+    result.to_csv(out, header=False, index=False)
+
+    stats["rows"] += len(frame)
+    stats["invalid"] += int((~valid).sum())
+    stats["histogram"] += np.bincount(totals[valid] - instrument.min_score, minlength=len(stats["histogram"]))
+
+
+def _text_chunks(task):
+    read = pd.read_csv if task.fmt == "csv" else lambda buf, **kw: pd.read_json(buf, lines=True, **kw)
+    usecols = list(task.columns) + ([task.id_column] if task.id_column else [])
+    with open(task.path, "rb") as fh:
+        fh.seek(task.start)
+        while fh.tell() < task.end:
+            lines = []
+            while len(lines) < task.chunk_rows and fh.tell() < task.end:
+                line = fh.readline()
+                if not line:
+                    break
+                if line.strip():
+                    lines.append(line)
+            if not lines:
+                break
+            buf = io.BytesIO(task.header + b"".join(lines))
+            if task.fmt == "csv":
+                yield read(buf, usecols=lambda column: column in usecols)
+            else:
+                yield read(buf)
+
+
+def _parquet_chunks(task):
+    import pyarrow.parquet as pq
+
+    columns = list(task.columns) + ([task.id_column] if task.id_column else [])
+    parquet = pq.ParquetFile(task.path)
+    for batch in parquet.iter_batches(batch_size=task.chunk_rows, row_groups=[task.row_group], columns=columns):
+        yield batch.to_pandas()
+
+
+def score_part(task):
+    stats = {"rows": 0, "invalid": 0, "histogram": _empty_histogram(task.instrument)}
+    lookup = _percentile_lookup(task.instrument)
+    chunks = _parquet_chunks(task) if task.fmt == "parquet" else _text_chunks(task)
+    with open(task.part_path, "w", newline="") as out:
+        for frame in chunks:
+            _score_frame(frame, task, out, stats, lookup, stats["rows"])
+    return stats
+
+
+def input_columns(path, fmt):
+    """Column names of the input file; for NDJSON, those of its first record."""
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetFile(path).schema_arrow.names
+    if fmt == "csv":
+        return list(pd.read_csv(path, nrows=0).columns)
+    with open(path, "rb") as fh:
+        for line in fh:
+            if line.strip():
+                return list(json.loads(line))
+    return []
+
+
+def split_text(path, parts, has_header):
+    """Split a line-oriented file into newline-aligned byte ranges."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        header = fh.readline() if has_header else b""
+        start = fh.tell()
+        bounds = [start]
+        for i in range(1, parts):
+            fh.seek(max(start + (size - start) * i // parts, bounds[-1]))
+            fh.readline()
+            bounds.append(fh.tell())
+        bounds.append(size)
+    ranges = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+    return header, ranges
+
+
+def build_tasks(args, fmt, instrument, tmpdir):
+    common = dict(
+        path=args.input,
+        fmt=fmt,
+        instrument=instrument,
+        columns=tuple(args.columns),
+        id_column=args.id_column,
+        chunk_rows=args.chunk_rows,
+        strict=args.strict,
+    )
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        row_groups = pq.ParquetFile(args.input).metadata.num_row_groups
+        return [
+            Task(part_path=os.path.join(tmpdir, f"part-{i:05d}.csv"), row_group=i, **common)
+            for i in range(row_groups)
+        ]
+    # Several ranges per worker keeps the pool busy when rows differ in size.
+    header, ranges = split_text(args.input, args.jobs * 4, has_header=fmt == "csv")
+    return [
+        Task(part_path=os.path.join(tmpdir, f"part-{i:05d}.csv"), start=start, end=end, header=header, **common)
+        for i, (start, end) in enumerate(ranges)
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score intellectual humility responses in bulk.")
+    parser.add_argument("input", help="CSV, NDJSON/JSONL or Parquet file")
+    parser.add_argument("-o", "--output", required=True, help="CSV file to write")
+    parser.add_argument("--format", choices=sorted(set(FORMATS.values())), help="input format (default: from extension)")
+    parser.add_argument("--instrument", default=instruments.DEFAULT_INSTRUMENT,
+                        help="instrument id, see instruments/ (default: %(default)s)")
+    parser.add_argument("--columns", type=lambda value: value.split(","),
+                        help="comma-separated item columns in item order (default: q1..qN)")
+    parser.add_argument("--id-column", help="column to copy into the output")
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--strict", action="store_true", help="fail on the first invalid row instead of leaving it unscored")
+    args = parser.parse_args(argv)
+
+    fmt = args.format or FORMATS.get(os.path.splitext(args.input)[1].lower())
+    if fmt is None:
+        parser.error(f"cannot infer the format of {args.input}; pass --format")
+    try:
+        instrument = instruments.get(args.instrument)
+    except KeyError:
+        parser.error(f"unknown instrument {args.instrument!r}; available: {', '.join(instruments.available())}")
+    except instruments.InvalidInstrument as exc:
+        parser.error(str(exc))
+    if args.columns is None:
+        args.columns = list(instrument.columns)
+    if len(args.columns) != len(instrument.items):
+        parser.error(f"expected {len(instrument.items)} item columns, got {len(args.columns)}")
+    try:
+        available = input_columns(args.input, fmt)
+    except (OSError, ValueError) as exc:
+        parser.error(f"cannot read the columns of {args.input}: {exc}")
+    missing = [column for column in args.columns + [args.id_column] if column and column not in available]
+    if missing:
+        parser.error(f"{args.input} has no column {', '.join(missing)}")
+
+    output_dir = os.path.dirname(os.path.abspath(args.output))
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmpdir:
+        tasks = build_tasks(args, fmt, instrument, tmpdir)
+        totals = {"rows": 0, "invalid": 0, "histogram": _empty_histogram(instrument)}
+        try:
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                for stats in pool.map(score_part, tasks):
+                    for key in totals:
+                        totals[key] += stats[key]
+        except InvalidResponses as exc:
+            sys.exit(f"error: {exc}")
+
+        with open(args.output, "w", newline="") as out:
+            columns = ([args.id_column] if args.id_column else []) + ["total", "percentile", "tier"]
+            out.write(",".join(columns) + "\n")
+            for task in tasks:
+                with open(task.part_path) as part:
+                    shutil.copyfileobj(part, out)
+
+    scored = totals["rows"] - totals["invalid"]
+    print(f"scored {scored:,} of {totals['rows']:,} rows ({totals['invalid']:,} invalid) -> {args.output}", file=sys.stderr)
+    if scored:
+        counts = totals["histogram"]
+        mean = float((counts * np.arange(instrument.min_score, instrument.max_score + 1)).sum() / scored)
+        shares = {tier: 0 for tier in (TOP, MIDDLE, BOTTOM)}
+        _, tiers = _percentile_lookup(instrument)
+        for tier, count in zip(tiers, counts):
+            shares[tier] += int(count)
+        print(
+            f"mean total {mean:.2f}; "
+            + ", ".join(f"{tier} {100 * count / scored:.1f}%" for tier, count in shares.items()),
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
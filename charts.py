@@ -0,0 +1,160 @@
+"""The results chart, as an interactive Plotly figure or a static SVG.
+
+A results view can only show one of a few possible totals (25 for the six-item
+scale) against a given norm, so both kinds of chart are built once per process
+and cached by total and norm. The SVG needs no client-side plotting library and
+is a fraction of the size of the equivalent Plotly figure JSON.
+
+The caches are plain functools caches rather than st.cache_resource, so that
+serve.py can fill them before the server accepts its first session.
+"""
+from functools import lru_cache
+from html import escape
+
+from norms import normal_pdf
+
+WIDTH = 700
+HEIGHT = 380
+LEFT, RIGHT, TOP, BOTTOM = 40, 20, 50, 110
+CURVE_POINTS = 121
+SCORE_LINE_HEIGHT = 0.1
+
+
+def _y(value, y_max):
+    return HEIGHT - BOTTOM - value / y_max * (HEIGHT - TOP - BOTTOM)
+
+
+@lru_cache(maxsize=25 * 8)
+def _render(total, mean, std, lo, hi, construct, version):
+    # version is part of the cache key only.
+    peak = normal_pdf(mean, mean, std)
+    y_max = max(peak, SCORE_LINE_HEIGHT) * 1.05
+    baseline = _y(0, y_max)
+
+    def x(value):
+        return LEFT + (value - lo) / (hi - lo) * (WIDTH - LEFT - RIGHT)
+
+    step = (hi - lo) / (CURVE_POINTS - 1)
+    points = " ".join(
+        f"{x(v):.1f},{_y(normal_pdf(v, mean, std), y_max):.1f}"
+        for v in (lo + i * step for i in range(CURVE_POINTS))
+    )
+    tick_step = 5 if hi - lo > 10 else 1
+    ticks = "".join(
+        f'<line x1="{x(t):.1f}" y1="{baseline:.1f}" x2="{x(t):.1f}" y2="{baseline + 5:.1f}" stroke="#444"/>'
+        f'<text x="{x(t):.1f}" y="{baseline + 20:.1f}" text-anchor="middle">{t}</text>'
+        for t in range(-(-lo // tick_step) * tick_step, hi + 1, tick_step)
+    )
+    mean_label = escape(f"Population Average = {mean}")
+    score_label = escape(f"Your Score = {total}")
+    legend_y = HEIGHT - 25
+    return (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {WIDTH} {HEIGHT}" width="100%" '
+        f'role="img" aria-label="{score_label}; {mean_label}" '
+        f'font-family="sans-serif" font-size="13" fill="#444">'
+        f'<text x="{LEFT}" y="25" font-size="17">{escape(f"Estimated Distribution of {construct} Scores")}</text>'
+        f'<polygon points="{x(lo):.1f},{baseline:.1f} {points} {x(hi):.1f},{baseline:.1f}" '
+        f'fill="rgba(135,206,235,0.5)" stroke="skyblue" stroke-width="2"/>'
+        f'<line x1="{x(mean):.1f}" y1="{baseline:.1f}" x2="{x(mean):.1f}" y2="{_y(peak, y_max):.1f}" '
+        f'stroke="red" stroke-width="3" stroke-dasharray="9,6"/>'
+        f'<line x1="{x(total):.1f}" y1="{baseline:.1f}" x2="{x(total):.1f}" y2="{_y(SCORE_LINE_HEIGHT, y_max):.1f}" '
+        f'stroke="green" stroke-width="3" stroke-dasharray="3,4"/>'
+        f'<line x1="{LEFT}" y1="{baseline:.1f}" x2="{WIDTH - RIGHT}" y2="{baseline:.1f}" stroke="#444"/>'
+        f'<line x1="{LEFT}" y1="{TOP}" x2="{LEFT}" y2="{baseline:.1f}" stroke="#444"/>'
+        f"{ticks}"
+        f'<text x="{(LEFT + WIDTH - RIGHT) / 2:.1f}" y="{baseline + 42:.1f}" text-anchor="middle">Total Score</text>'
+        f'<text transform="translate(18 {(TOP + baseline) / 2:.1f}) rotate(-90)" text-anchor="middle">Distribution</text>'
+        f'<line x1="{WIDTH / 2 - 230}" y1="{legend_y}" x2="{WIDTH / 2 - 200}" y2="{legend_y}" '
+        f'stroke="red" stroke-width="3" stroke-dasharray="9,6"/>'
+        f'<text x="{WIDTH / 2 - 192}" y="{legend_y + 4}">{mean_label}</text>'
+        f'<line x1="{WIDTH / 2 + 40}" y1="{legend_y}" x2="{WIDTH / 2 + 70}" y2="{legend_y}" '
+        f'stroke="green" stroke-width="3" stroke-dasharray="3,4"/>'
+        f'<text x="{WIDTH / 2 + 78}" y="{legend_y + 4}">{score_label}</text>'
+        f"</svg>"
+    )
+
+
+# plotly is only imported by the functions below, so the intro and question
+# pages never pay for loading the plotting stack. The population curve and its
+# two fixed traces never change between respondents, so build them once and
+# only stamp the "Your Score" marker onto a copy. Copying a figure still costs
+# a full layout/template validation, so the stamped figures are cached too;
+# st.plotly_chart never mutates them.
+@lru_cache(maxsize=32)
+def _base_figure(mean_score, std_dev, min_score, max_score, construct):
+    import plotly.graph_objects as go
+
+    x_vals_cut = [min_score + (max_score - min_score) * i / 499 for i in range(500)]
+    y_vals_cut = [normal_pdf(x, mean_score, std_dev) for x in x_vals_cut]
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(
+        x=x_vals_cut,
+        y=y_vals_cut,
+        mode='lines',
+        line=dict(color='skyblue'),
+        fill='tozeroy',
+        name='',
+        hoverinfo='skip',
+        showlegend=False
+    ))
+    fig.add_trace(go.Scatter(
+        x=[mean_score, mean_score],
+        y=[0, normal_pdf(mean_score, mean_score, std_dev)],
+        mode='lines',
+        line=dict(color='red', dash='dash', width=3),
+        name=f'Population Average = {mean_score}',
+        hoverinfo='skip'
+    ))
+    fig.update_layout(
+        title=f'Estimated Distribution of {construct} Scores',
+        xaxis_title='Total Score',
+        yaxis_title='Distribution',
+        yaxis=dict(showticklabels=False),
+        xaxis=dict(range=[min_score, max_score]),
+        template='simple_white',
+        showlegend=True,
+        legend=dict(
+            orientation='h',
+            yanchor='bottom',
+            xanchor='center',
+            y= -0.4,
+            x=0.5,
+          ),
+    )
+    return fig
+
+
+@lru_cache(maxsize=256)
+def _figure(total_score, mean_score, std_dev, min_score, max_score, construct):
+    import plotly.graph_objects as go
+
+    # go.Figure(fig) copies the cached figure, so the shared base is never mutated.
+    fig = go.Figure(_base_figure(mean_score, std_dev, min_score, max_score, construct))
+    fig.add_trace(go.Scatter(
+        x=[total_score, total_score],
+        y=[0, SCORE_LINE_HEIGHT],
+        mode='lines',
+        line=dict(color='green', dash='dot', width=3),
+        name=f'Your Score = {total_score}',
+        hoverinfo='skip'
+    ))
+    return fig
+
+
+def results_figure(total, norm, construct="Intellectual Humility"):
+    # Rounded so the cached base figure is reused while a live norm drifts.
+    return _figure(total, round(norm.mean, 2), round(norm.std, 2), norm.min_score, norm.max_score, construct)
+
+
+def results_svg(total, norm, construct="Intellectual Humility"):
+    # Rounded like the Plotly figure so a drifting live norm reuses entries.
+    return _render(
+        total, round(norm.mean, 2), round(norm.std, 2), norm.min_score, norm.max_score, construct, norm.version
+    )
+
+
+def prerender(norm, construct="Intellectual Humility", kind="svg"):
+    """Build the kind ("svg" or "plotly") of chart for every possible total."""
+    render = results_svg if kind == "svg" else results_figure
+    for total in range(norm.min_score, norm.max_score + 1):
+        render(total, norm, construct)
@@ -0,0 +1,167 @@
+"""Cohort-specific norms: score distributions by age band, education and source.
+
+An instrument may ship instruments/<id>.cohorts.csv with one row per cohort:
+the columns age, education and source, then one count column per possible
+total ("6" to "30" for the six-item scale). "*" in a cohort column marks a
+row that already aggregates over that dimension. Every coarser cell that no
+row defines, down to ("*", "*", "*"), is the sum of the fully specified rows
+below it.
+
+get() loads a file once (until its mtime changes) into contiguous arrays
+indexed by cell id x score: counts, percentiles (ties count half, as in
+norms.Norm.percentile), and the mean, standard deviation and size of each
+cell. A cell with fewer than min_n cases falls back to its parent: first
+source, then education, then age band is widened to "*". The fallback is
+resolved for every cell at load time, so a request costs a dict lookup for
+its cohort and one index into the percentile array.
+"""
+import csv
+import os
+import threading
+from itertools import product
+from typing import NamedTuple
+
+import numpy as np
+
+import instruments
+from norms import ANY_COHORT as ANY, COHORT_DIMENSIONS as DIMENSIONS, Norm
+
+MIN_N = int(os.environ.get("INTHUM_COHORT_MIN_N", "100"))
+
+
+class InvalidCohortTable(ValueError):
+    pass
+
+
+def fallback_chain(key):
+    """key, then key widened one dimension at a time from the last."""
+    chain = [key]
+    for i in reversed(range(len(key))):
+        if key[i] != ANY:
+            key = key[:i] + (ANY,) + key[i + 1:]
+            chain.append(key)
+    return chain
+
+
+def cohort_label(key):
+    parts = [f"{name} {value}" for name, value in zip(DIMENSIONS, key) if value != ANY]
+    return ", ".join(parts) or "all cohorts"
+
+
+class CohortNorms(NamedTuple):
+    index: dict            # cohort key -> cell id
+    keys: tuple            # cell id -> cohort key
+    counts: np.ndarray     # (cells, scores) int64
+    percentiles: np.ndarray  # (cells, scores) float64, of the resolved cell
+    n: np.ndarray          # (cells,) cases in the cell itself
+    resolved: np.ndarray   # (cells,) cell whose distribution stands in for each cell
+    norms: tuple           # cell id -> Norm of the resolved cell (curve data)
+    min_score: int
+
+    def resolve(self, key):
+        """Cell id used for a cohort key, or None if nothing has enough cases."""
+        key = tuple(key)
+        cell = self.index.get(key)
+        if cell is None:
+            # Values the file does not know widen the key like small cells do.
+            for candidate in fallback_chain(key)[1:]:
+                cell = self.index.get(candidate)
+                if cell is not None:
+                    break
+            else:
+                return None
+        resolved = self.resolved.item(cell)
+        return None if resolved < 0 else resolved
+
+    def percentile(self, cell, total):
+        return self.percentiles.item(cell, total - self.min_score)
+
+    def norm(self, cell):
+        return self.norms[cell]
+
+
+def build(rows, min_score, max_score, min_n=MIN_N):
+    """CohortNorms from (key, counts) pairs; counts has one entry per total."""
+    scores = max_score - min_score + 1
+    cells = {}
+    explicit = set()
+    for key, counts in rows:
+        if len(key) != len(DIMENSIONS) or len(counts) != scores:
+            raise InvalidCohortTable(f"cohort {key!r} needs {len(DIMENSIONS)} keys and {scores} counts")
+        if key in explicit:
+            raise InvalidCohortTable(f"cohort {key!r} appears twice")
+        explicit.add(key)
+        cells[key] = np.asarray(counts, dtype=np.int64)
+    for key in [key for key in explicit if ANY not in key]:
+        for mask in product((False, True), repeat=len(key)):
+            parent = tuple(ANY if wide else value for wide, value in zip(mask, key))
+            if parent == key or parent in explicit:
+                continue
+            if parent in cells:
+                cells[parent] = cells[parent] + cells[key]
+            else:
+                cells[parent] = cells[key].copy()
+
+    keys = tuple(sorted(cells))
+    index = {key: cell for cell, key in enumerate(keys)}
+    counts = np.ascontiguousarray(np.stack([cells[key] for key in keys]) if keys else np.zeros((0, scores), np.int64))
+    n = counts.sum(axis=1)
+
+    resolved = np.full(len(keys), -1, dtype=np.intp)
+    for cell, key in enumerate(keys):
+        for candidate in fallback_chain(key):
+            parent = index.get(candidate)
+            if parent is not None and n[parent] >= max(min_n, 2):
+                resolved[cell] = parent
+                break
+
+    totals = np.arange(min_score, max_score + 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        own = 100 * (np.cumsum(counts, axis=1) - 0.5 * counts) / n[:, None]
+        mean = counts @ totals / n
+        std = np.sqrt(np.maximum(counts @ totals ** 2 / n - mean ** 2, 0) * n / np.maximum(n - 1, 1))
+    percentiles = np.ascontiguousarray(own[np.maximum(resolved, 0)])
+    norms = tuple(
+        None if resolved[cell] < 0 else Norm(
+            float(mean[resolved[cell]]), float(std[resolved[cell]]), int(n[resolved[cell]]),
+            f"cohort:{cohort_label(keys[resolved[cell]])}", None, min_score, max_score,
+        )
+        for cell in range(len(keys))
+    )
+    return CohortNorms(index, keys, counts, percentiles, n, resolved, norms, min_score)
+
+
+def load(path, min_score, max_score, min_n=MIN_N):
+    with open(path, newline="", encoding="utf-8") as fh:
+        reader = csv.reader(fh)
+        header = next(reader, None)
+        expected = list(DIMENSIONS) + [str(total) for total in range(min_score, max_score + 1)]
+        if header != expected:
+            raise InvalidCohortTable(f"{path}: expected columns {','.join(expected)}")
+        dims = len(DIMENSIONS)
+        try:
+            rows = [(tuple(row[:dims]), [int(count) for count in row[dims:]]) for row in reader if row]
+        except ValueError as exc:
+            raise InvalidCohortTable(f"{path}: {exc}") from None
+    return build(rows, min_score, max_score, min_n)
+
+
+_lock = threading.Lock()
+_loaded = {}  # path -> (mtime_ns, CohortNorms)
+
+
+def get(instrument, directory=instruments.INSTRUMENTS_DIR):
+    """The instrument's cohort norms, or None if it has no cohorts file."""
+    path = os.path.join(directory, f"{instrument.id}.cohorts.csv")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _loaded.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _loaded.get(path)
+        if cached is None or cached[0] != mtime:
+            cached = _loaded[path] = (mtime, load(path, instrument.min_score, instrument.max_score))
+        return cached[1]
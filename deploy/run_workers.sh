@@ -0,0 +1,86 @@
+#!/usr/bin/env bash
+# Run several Streamlit workers behind HAProxy on one machine.
+#
+#   INTHUM_WORKERS=4 deploy/run_workers.sh
+#
+# HAProxy listens on $PORT (default 8501) and spreads new browsers over the
+# workers, then pins each one to its worker with a cookie: a Streamlit session
+# lives in the memory of the process that serves its websocket. Quiz progress
+# is checkpointed to INTHUM_PROGRESS_DB, so a respondent whose worker restarts
+# resumes on another one. Workers start through serve.py, which warms each
+# process up before it listens, so the health check only passes warm workers.
+# With INTHUM_LANDING=static, HAProxy answers GET / (without a query string)
+# with static/landing.html itself, so visitors who never click Start cost no
+# Streamlit session (see landing.py). With INTHUM_WORKERS=1 (the default) and
+# no static landing page this simply execs a single server.
+set -euo pipefail
+
+WORKERS="${INTHUM_WORKERS:-1}"
+PORT="${PORT:-8501}"
+BASE_PORT="${INTHUM_WORKER_BASE_PORT:-8600}"
+LANDING="${INTHUM_LANDING:-}"
+cd "$(dirname "$0")/.."
+
+if [ "$WORKERS" -le 1 ] && [ "$LANDING" != "static" ]; then
+    exec python serve.py --server.port "$PORT"
+fi
+
+export INTHUM_PROGRESS_DB="${INTHUM_PROGRESS_DB:-data/progress.sqlite3}"
+NORMS_CHECKPOINT="${INTHUM_NORMS_CHECKPOINT-data/live_norms.json}"
+CONFIG="$(mktemp -t inthum-haproxy.XXXXXX)"
+LANDING_RULE=""
+if [ "$LANDING" = "static" ]; then
+    LANDING_RULE="    http-request return status 200 content-type \"text/html; charset=utf-8\" file \"$PWD/static/landing.html\" hdr Cache-Control \"public, max-age=300\" if { method GET HEAD } { path / } !{ query -m found }"
+fi
+
+cat > "$CONFIG" <<EOF
+global
+    maxconn 4096
+
+defaults
+    mode http
+    timeout connect 5s
+    timeout client 60s
+    timeout server 60s
+    # Each browser tab holds one websocket open for the whole quiz.
+    timeout tunnel 1h
+
+frontend inthum
+    bind :${PORT}
+${LANDING_RULE}
+    default_backend workers
+
+backend workers
+    balance leastconn
+    cookie INTHUM_WORKER insert indirect nocache httponly
+    option httpchk GET /_stcore/health
+EOF
+
+pids=()
+trap 'kill "${pids[@]}" 2>/dev/null || true; rm -f "$CONFIG"' EXIT
+trap 'exit 143' TERM
+trap 'exit 130' INT
+
+for i in $(seq 1 "$WORKERS"); do
+    port=$((BASE_PORT + i))
+    echo "    server w$i 127.0.0.1:$port check cookie w$i" >> "$CONFIG"
+    (
+        # Metrics ports and live-norm checkpoints are per process; the
+        # response and progress databases are shared.
+        if [ -n "${INTHUM_METRICS_PORT:-}" ]; then
+            export INTHUM_METRICS_PORT=$((INTHUM_METRICS_PORT + i))
+        fi
+        if [ -n "$NORMS_CHECKPOINT" ]; then
+            export INTHUM_NORMS_CHECKPOINT="${NORMS_CHECKPOINT%.json}.w$i.json"
+        fi
+        exec python serve.py --server.port "$port" --server.address 127.0.0.1
+    ) &
+    pids+=($!)
+done
+
+haproxy -f "$CONFIG" -db &
+pids+=($!)
+
+# Stop everything as soon as any process exits, so a supervisor restarts the
+# whole group.
+wait -n
@@ -0,0 +1,153 @@
+"""Questionnaires defined in data files and compiled once per process.
+
+Each instruments/<id>.json file describes one scale: the items in
+presentation order (an item with "reverse": true is reverse-keyed), the
+answer labels, and the published norm for the total score. Items may also
+carry graded response model parameters ("irt": {"a": ..., "b": [...]}, one
+threshold per answer boundary), which enable the adaptive mode in cat.py.
+get() parses a file into an immutable Instrument that already holds
+everything scoring needs, including the percentile table, and caches it until
+the file's mtime changes, so looking one up per rerun is a stat() and a dict
+lookup.
+"""
+import json
+import os
+import threading
+from typing import NamedTuple, Optional, Tuple
+
+from norms import Norm
+from scoring import PercentileTable, percentile_table
+
+INSTRUMENTS_DIR = os.environ.get(
+    "INTHUM_INSTRUMENTS_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instruments"),
+)
+DEFAULT_INSTRUMENT = "ihs6"
+
+
+class InvalidInstrument(ValueError):
+    pass
+
+
+class Instrument(NamedTuple):
+    id: str
+    title: str
+    construct: str
+    prompt: str
+    items: Tuple[str, ...]
+    reverse: Tuple[bool, ...]
+    scale: Tuple[str, ...]  # labels for answers 1..len(scale)
+    norm: Norm
+    reference: str
+    table: PercentileTable
+    # Per item (discrimination, thresholds) on the keyed answers, or None.
+    irt: Optional[Tuple[Tuple[float, Tuple[float, ...]], ...]] = None
+
+    @property
+    def min_score(self):
+        return len(self.items)
+
+    @property
+    def max_score(self):
+        return len(self.items) * len(self.scale)
+
+    @property
+    def columns(self):
+        # Column names used for the items in response files.
+        return tuple(f"q{i + 1}" for i in range(len(self.items)))
+
+    def is_answer(self, value):
+        return value in range(1, len(self.scale) + 1)
+
+    def total(self, answers):
+        """Total score of raw 1..len(scale) answers, reverse-keyed items flipped."""
+        flip = len(self.scale) + 1
+        return sum(flip - answer if reverse else answer for answer, reverse in zip(answers, self.reverse))
+
+    def score(self, answers, norm=None):
+        """Return (total, percentile, tier), against the published norm by default."""
+        table = self.table if norm is None else percentile_table(norm)
+        total = self.total(answers)
+        return total, table.percentile(total), table.tier(total)
+
+
+def compile_instrument(spec, instrument_id):
+    try:
+        scale = tuple(str(label) for label in spec["scale"])
+        items = tuple(str(item["text"]) for item in spec["items"])
+        reverse = tuple(bool(item.get("reverse", False)) for item in spec["items"])
+        norm_spec = spec["norm"]
+        mean, std = float(norm_spec["mean"]), float(norm_spec["std"])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise InvalidInstrument(f"{instrument_id}: malformed instrument ({exc!r})") from None
+    if spec.get("id", instrument_id) != instrument_id:
+        raise InvalidInstrument(f"{instrument_id}: id {spec['id']!r} does not match the file name")
+    if not items or len(scale) < 2:
+        raise InvalidInstrument(f"{instrument_id}: needs at least one item and two answer labels")
+    if std <= 0:
+        raise InvalidInstrument(f"{instrument_id}: norm std must be positive")
+    irt = _compile_irt(spec["items"], len(scale), instrument_id)
+    norm = Norm(mean, std, min_score=len(items), max_score=len(items) * len(scale))
+    return Instrument(
+        id=instrument_id,
+        title=spec.get("title", instrument_id),
+        construct=spec.get("construct", spec.get("title", instrument_id)),
+        prompt=spec.get("prompt", ""),
+        items=items,
+        reverse=reverse,
+        scale=scale,
+        norm=norm,
+        reference=norm_spec.get("reference", ""),
+        table=percentile_table(norm),
+        irt=irt,
+    )
+
+
+def _compile_irt(items, categories, instrument_id):
+    if not any("irt" in item for item in items):
+        return None
+    params = []
+    for number, item in enumerate(items, start=1):
+        try:
+            a = float(item["irt"]["a"])
+            b = tuple(float(threshold) for threshold in item["irt"]["b"])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidInstrument(f"{instrument_id}: item {number} has no valid irt parameters") from None
+        if a <= 0 or len(b) != categories - 1 or list(b) != sorted(b):
+            raise InvalidInstrument(
+                f"{instrument_id}: item {number} needs a > 0 and {categories - 1} increasing thresholds"
+            )
+        params.append((a, b))
+    return tuple(params)
+
+
+_lock = threading.Lock()
+_compiled = {}  # path -> (mtime_ns, Instrument)
+
+
+def get(instrument_id=DEFAULT_INSTRUMENT, directory=INSTRUMENTS_DIR):
+    """The compiled instrument; raises KeyError if there is no such file."""
+    if not instrument_id.isidentifier():
+        raise KeyError(instrument_id)
+    path = os.path.join(directory, f"{instrument_id}.json")
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise KeyError(instrument_id) from None
+    cached = _compiled.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    with _lock:
+        cached = _compiled.get(path)
+        if cached is None or cached[0] != mtime:
+            with open(path, encoding="utf-8") as fh:
+                try:
+                    spec = json.load(fh)
+                except ValueError as exc:
+                    raise InvalidInstrument(f"{path}: {exc}") from None
+            cached = _compiled[path] = (mtime, compile_instrument(spec, instrument_id))
+        return cached[1]
+
+
+def available(directory=INSTRUMENTS_DIR):
+    return sorted(name[:-5] for name in os.listdir(directory) if name.endswith(".json"))
@@ -0,0 +1,124 @@
+"""The intro page as a static, cacheable landing page.
+
+INTRO_TITLE and INTRO_MARKDOWN are what intro_page() renders in the app. Built
+into static/landing.html, the same content is served without a Streamlit
+session: Streamlit's static file handler answers /app/static/landing.html,
+and with INTHUM_LANDING=static deploy/run_workers.sh has HAProxy answer
+requests for / itself. Only the Start button opens the app, at /?start=1,
+which begins a session directly on the questions page. Rebuild the page
+after editing the text:
+
+    python landing.py
+"""
+import argparse
+import html
+import os
+import re
+
+INTRO_TITLE = "Intellectual Humility Assessment"
+INTRO_MARKDOWN = """\
+**Do you have an intellectually humble mindset? Use this quiz to find out!**
+
+**What is intellectual humility?**
+- Being open to new ideas
+- Being willing to reconsider your beliefs when presented with new information or perspectives
+- Recognizing that you might not always have all the answers
+- Acknowledging that your knowledge and understanding can have limitations
+- Challenging your assumptions, biases, and level of certainty about something or someone
+
+**Why should I care about intellectual humility?**
+
+Research shows [intellectual humility](https://www.templeton.org/news/what-is-intellectual-humility) may enhance tolerance from other perspectives and promote inquiry.
+
+**Instructions**
+
+This quiz asks six questions to generate your intellectual humility score and will compare your score to the general public.
+
+*This quiz is based on the scale developed by [Leary et al.](https://pubmed.ncbi.nlm.nih.gov/28903672/) in their research on the features of intellectual humility. This quiz is currently experimental and was partially supported by the John Templeton Foundation. Please provide feedback and report any issues to [info@polarizationlab.com](mailto:info@polarizationlab.com).*
+"""
+START_LABEL = "Start Assessment"
+START_PARAM = "start"
+OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "landing.html")
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{title}</title>
+<style>
+  body {{ margin: 0; font-family: "Source Sans Pro", "Source Sans 3", system-ui, sans-serif;
+         font-size: 1rem; line-height: 1.6; color: rgb(49, 51, 63); background: #fff; }}
+  main {{ max-width: 50rem; margin: 0 auto; padding: 3rem 1rem 2rem; }}
+  h1 {{ font-size: 2.75rem; font-weight: 700; line-height: 1.2; margin: 0 0 1rem; }}
+  p, ul {{ margin: 0 0 1rem; }}
+  a {{ color: rgb(0, 104, 201); }}
+  .start {{ text-align: center; margin-top: 1.5rem; }}
+  .start a {{ display: inline-block; width: 33%; min-width: 12rem; padding: 0.5rem 0.75rem;
+             border-radius: 0.5rem; background: rgb(255, 75, 75); color: #fff; text-decoration: none; }}
+  .start a:hover {{ background: rgb(255, 51, 51); }}
+</style>
+</head>
+<body>
+<main>
+<h1>{title}</h1>
+{body}
+<div class="start"><a id="start" href="{start_url}">{start_label}</a></div>
+</main>
+<script>
+  // Carry ?instrument= and similar parameters over to the app.
+  var params = new URLSearchParams(window.location.search);
+  if (params.toString()) {{
+    var link = document.getElementById("start");
+    params.set("{start_param}", "1");
+    link.href = link.href.split("?")[0] + "?" + params.toString();
+  }}
+</script>
+</body>
+</html>
+"""
+
+
+def _inline(text):
+    # The subset of Markdown the intro uses: links, bold and italics.
+    text = html.escape(text, quote=False)
+    text = re.sub(r"\[([^\]]+)\]\(([^)\s]+)\)",
+                  lambda m: f'<a href="{html.escape(m.group(2))}" target="_blank" rel="noopener">{m.group(1)}</a>', text)
+    text = re.sub(r"\*\*(.+?)\*\*", r"<strong>\1</strong>", text)
+    return re.sub(r"\*(.+?)\*", r"<em>\1</em>", text)
+
+
+def markdown_to_html(markdown):
+    blocks = []
+    for block in markdown.strip().split("\n\n"):
+        lines = block.splitlines()
+        paragraph = [line for line in lines if not line.startswith("- ")]
+        items = [line[2:] for line in lines if line.startswith("- ")]
+        if paragraph:
+            blocks.append(f"<p>{_inline(' '.join(paragraph))}</p>")
+        if items:
+            blocks.append("<ul>\n" + "\n".join(f"<li>{_inline(item)}</li>" for item in items) + "\n</ul>")
+    return "\n".join(blocks)
+
+
+def render(base_url="/"):
+    return PAGE.format(
+        title=html.escape(INTRO_TITLE),
+        body=markdown_to_html(INTRO_MARKDOWN),
+        start_url=f"{base_url}?{START_PARAM}=1",
+        start_label=START_LABEL,
+        start_param=START_PARAM,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static landing page.")
+    parser.add_argument("-o", "--output", default=OUTPUT)
+    parser.add_argument("--base-url", default="/", help="URL path the app is served under")
+    args = parser.parse_args()
+    with open(args.output, "w", encoding="utf-8") as fh:
+        fh.write(render(args.base_url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""Population norms for questionnaire total scores.
+
+The published norm of the six-item intellectual humility scale (Deffler,
+Leary, and Hoyle, 2016) is always available; other instruments carry their
+own (see instruments.py). LiveNorm additionally keeps a running norm from
+this app's own respondents: an integer histogram over the possible totals
+(25 for the six-item scale) plus Welford's running
+mean and variance. Each submission updates both in constant time, and the
+live values replace the published norm once enough respondents have been
+seen.
+"""
+import atexit
+import json
+import logging
+import math
+import os
+import threading
+import time
+from typing import NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+MIN_SCORE = 6
+MAX_SCORE = 30
+PUBLISHED_MEAN = 22.64
+PUBLISHED_STD = 3.98
+
+# Cohort norms (see cohorts.py) are keyed by these dimensions; ANY_COHORT in a
+# dimension matches every value.
+COHORT_DIMENSIONS = ("age", "education", "source")
+ANY_COHORT = "*"
+
+
+def normal_pdf(x, mean, std):
+    z = (x - mean) / std
+    return math.exp(-0.5 * z * z) / (std * math.sqrt(2 * math.pi))
+
+
+def normal_cdf(x, mean, std):
+    return 0.5 * (1 + math.erf((x - mean) / (std * math.sqrt(2))))
+
+
+class Norm(NamedTuple):
+    mean: float
+    std: float
+    n: Optional[int] = None
+    source: str = "published"
+    histogram: Optional[Tuple[int, ...]] = None
+    min_score: int = MIN_SCORE
+    max_score: int = MAX_SCORE
+
+    @property
+    def is_live(self):
+        return self.source == "live"
+
+    @property
+    def is_cohort(self):
+        return self.source.startswith("cohort:")
+
+    @property
+    def version(self):
+        """Identifies what a chart drawn from this norm depends on."""
+        return f"{self.source}:{self.min_score}-{self.max_score}:{self.mean:.2f}:{self.std:.2f}"
+
+    def percentile(self, total):
+        """Percent of the norm group scoring below total (ties count half)."""
+        if self.histogram is None:
+            return 100 * normal_cdf(total, self.mean, self.std)
+        index = total - self.min_score
+        below = sum(self.histogram[:index])
+        return 100 * (below + 0.5 * self.histogram[index]) / sum(self.histogram)
+
+
+PUBLISHED_NORM = Norm(PUBLISHED_MEAN, PUBLISHED_STD)
+
+
+class LiveNorm:
+    """Process-wide running norm, safe to update from any session thread."""
+
+    def __init__(self, checkpoint_path=None, min_samples=200, checkpoint_interval=60.0,
+                 min_score=MIN_SCORE, max_score=MAX_SCORE):
+        self.checkpoint_path = checkpoint_path
+        self.min_samples = min_samples
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        self.min_score = min_score
+        self.max_score = max_score
+        self._histogram = [0] * (max_score - min_score + 1)
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._dirty = False
+        if checkpoint_path:
+            self._load()
+            threading.Thread(target=self._checkpoint_loop, name="live-norm-checkpoint", daemon=True).start()
+            atexit.register(self.checkpoint)
+
+    def add(self, total):
+        if not self.min_score <= total <= self.max_score:
+            raise ValueError(f"total score {total} is outside {self.min_score}-{self.max_score}")
+        with self._lock:
+            self._histogram[total - self.min_score] += 1
+            self._n += 1
+            delta = total - self._mean
+            self._mean += delta / self._n
+            self._m2 += delta * (total - self._mean)
+            self._dirty = True
+
+    def current(self, fallback=PUBLISHED_NORM):
+        """The live norm once min_samples is reached, fallback before."""
+        with self._lock:
+            n, mean, m2 = self._n, self._mean, self._m2
+            histogram = tuple(self._histogram)
+        if n < max(self.min_samples, 2):
+            return fallback
+        std = math.sqrt(m2 / (n - 1))
+        if std == 0:
+            return fallback
+        return Norm(mean, std, n, "live", histogram, self.min_score, self.max_score)
+
+    def checkpoint(self):
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            state = {
+                "histogram": list(self._histogram),
+                "n": self._n,
+                "mean": self._mean,
+                "m2": self._m2,
+            }
+            self._dirty = False
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump(state, fh)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _load(self):
+        try:
+            with open(self.checkpoint_path) as fh:
+                state = json.load(fh)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("ignoring unreadable norm checkpoint %s", self.checkpoint_path)
+            return
+        if len(state.get("histogram", ())) != len(self._histogram):
+            logger.warning("ignoring norm checkpoint %s with unexpected shape", self.checkpoint_path)
+            return
+        self._histogram = [int(count) for count in state["histogram"]]
+        self._n = int(state["n"])
+        self._mean = float(state["mean"])
+        self._m2 = float(state["m2"])
+
+    def _checkpoint_loop(self):
+        while True:
+            time.sleep(self.checkpoint_interval)
+            try:
+                self.checkpoint()
+            except OSError:
+                logger.exception("failed to checkpoint live norm to %s", self.checkpoint_path)
@@ -0,0 +1,183 @@
+"""Opt-in profiling of a sample of script runs, keeping only the slow ones.
+
+A fraction of runs (INTHUM_PROFILE_RATE) is profiled. A profile is saved only
+if the run took at least INTHUM_PROFILE_THRESHOLD_MS, under
+INTHUM_PROFILE_DIR with the page and question index in the file name; the
+oldest are deleted beyond INTHUM_PROFILE_KEEP.
+
+INTHUM_PROFILER picks the profiler. "pyinstrument" (the default if it is
+installed) writes speedscope JSON. "sampler" (the default otherwise) samples
+the script thread's stack from a helper thread and writes collapsed stacks
+(.folded) for flamegraph.pl, inferno or speedscope. "cprofile" writes a .prof
+file for snakeviz, tuna or flameprof; from Python 3.12 cProfile hooks every
+thread, so its call graph also mixes in the server's other threads. Only one
+run is profiled at a time.
+"""
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIXES = (".folded", ".prof", ".speedscope.json")
+
+
+class ProfilePolicy(NamedTuple):
+    rate: float = 0.0            # fraction of runs profiled, 0 = off
+    threshold_ms: float = 250.0  # keep profiles of runs at least this slow
+    directory: str = "data/profiles"
+    keep: int = 50               # profiles kept; older ones are deleted
+    engine: str = "auto"         # "auto", "sampler", "cprofile" or "pyinstrument"
+    interval_ms: float = 1.0     # sampling interval of the built-in sampler
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(
+            rate=float(environ.get("INTHUM_PROFILE_RATE", cls._field_defaults["rate"])),
+            threshold_ms=float(environ.get("INTHUM_PROFILE_THRESHOLD_MS", cls._field_defaults["threshold_ms"])),
+            directory=environ.get("INTHUM_PROFILE_DIR", cls._field_defaults["directory"]),
+            keep=int(environ.get("INTHUM_PROFILE_KEEP", cls._field_defaults["keep"])),
+            engine=environ.get("INTHUM_PROFILER", cls._field_defaults["engine"]),
+            interval_ms=float(environ.get("INTHUM_PROFILE_INTERVAL_MS", cls._field_defaults["interval_ms"])),
+        )
+
+    @property
+    def enabled(self):
+        return self.rate > 0
+
+
+class StackSampler:
+    """Collapsed stacks of one thread, sampled every interval seconds."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+
+class RerunProfiler:
+    def __init__(self, policy, on_save=None):
+        self.policy = policy
+        self.on_save = on_save
+        self._busy = threading.Lock()
+        engine = policy.engine
+        if engine == "auto":
+            try:
+                import pyinstrument  # noqa: F401
+                engine = "pyinstrument"
+            except ImportError:
+                engine = "sampler"
+        self.engine = engine
+
+    @contextmanager
+    def sample(self, page, question_index=None):
+        if random.random() >= self.policy.rate or not self._busy.acquire(blocking=False):
+            yield
+            return
+        try:
+            try:
+                profiler = self._start()
+            except ValueError:
+                # Another profiler (e.g. python -m cProfile) already owns the hooks.
+                yield
+                return
+            start = time.perf_counter()
+            try:
+                yield
+            finally:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                self._stop(profiler)
+                if elapsed_ms >= self.policy.threshold_ms:
+                    self._save(profiler, page, question_index, elapsed_ms)
+        finally:
+            self._busy.release()
+
+    def _start(self):
+        if self.engine == "pyinstrument":
+            from pyinstrument import Profiler
+
+            profiler = Profiler(interval=self.policy.interval_ms / 1000)
+            profiler.start()
+        elif self.engine == "sampler":
+            profiler = StackSampler(self.policy.interval_ms / 1000)
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _stop(self, profiler):
+        if self.engine in ("pyinstrument", "sampler"):
+            profiler.stop()
+        else:
+            profiler.disable()
+
+    def _save(self, profiler, page, question_index, elapsed_ms):
+        stem = f"{time.strftime('%Y%m%dT%H%M%S')}-{time.time_ns() % 1_000_000_000:09d}-{page}"
+        if question_index is not None:
+            stem += f"-q{question_index}"
+        stem = os.path.join(self.policy.directory, f"{stem}-{elapsed_ms:.0f}ms")
+        try:
+            os.makedirs(self.policy.directory, exist_ok=True)
+            if self.engine == "pyinstrument":
+                from pyinstrument.renderers import SpeedscopeRenderer
+
+                with open(f"{stem}.speedscope.json", "w") as fh:
+                    fh.write(profiler.output(SpeedscopeRenderer()))
+            elif self.engine == "sampler":
+                with open(f"{stem}.folded", "w") as fh:
+                    for stack, count in sorted(profiler.stacks.items()):
+                        fh.write(f"{stack} {count}\n")
+            else:
+                pstats.Stats(profiler).dump_stats(f"{stem}.prof")
+            self._rotate()
+        except OSError:
+            logger.exception("failed to save a profile to %s", self.policy.directory)
+            return
+        if self.on_save is not None:
+            self.on_save(page)
+
+    def _rotate(self):
+        # File names start with a timestamp, so name order is age order.
+        stems = sorted({
+            name[:-len(suffix)]
+            for name in os.listdir(self.policy.directory)
+            for suffix in PROFILE_SUFFIXES
+            if name.endswith(suffix)
+        })
+        for stem in stems[:max(0, len(stems) - self.policy.keep)]:
+            for suffix in PROFILE_SUFFIXES:
+                try:
+                    os.unlink(os.path.join(self.policy.directory, stem + suffix))
+                except FileNotFoundError:
+                    pass
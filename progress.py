@@ -0,0 +1,124 @@
+"""Quiz progress shared by every worker process on one machine.
+
+Each respondent gets a resume token (kept in the page URL) and their
+progress (instrument, page, question index and answers) is checkpointed under
+it in a local SQLite database in WAL mode. When a respondent's websocket lands
+on a worker that has never seen them, after a restart or when the proxy moves
+them, the new session restores the checkpoint.
+
+Like storage.ResponseWriter, saves never touch the disk on the script thread:
+the latest state per token is kept in memory and a background thread upserts
+whatever changed every flush_interval seconds. Loads read the database
+directly, which only happens when a session starts.
+"""
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress (
+    token TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL,
+    instrument TEXT NOT NULL,
+    page TEXT NOT NULL,
+    question_index INTEGER NOT NULL,
+    answers BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS progress_updated_at ON progress (updated_at);
+"""
+
+
+class Progress(NamedTuple):
+    instrument: str
+    page: str
+    question_index: int
+    answers: bytes
+
+
+class ProgressStore:
+    def __init__(self, path, flush_interval=0.25, ttl=7 * 24 * 3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._pending = {}
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self.prune()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="progress-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _connect(self):
+        # Every worker process writes here, so wait out their transactions.
+        conn = sqlite3.connect(self.path, timeout=5.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def save(self, token, progress):
+        with self._lock:
+            self._pending[token] = (time.time(), progress)
+
+    def load(self, token):
+        with self._lock:
+            pending = self._pending.get(token)
+        if pending is not None:
+            return pending[1]
+        try:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT instrument, page, question_index, answers FROM progress WHERE token = ?", (token,)
+                ).fetchone()
+        except sqlite3.Error:
+            logger.exception("failed to read progress from %s", self.path)
+            return None
+        return None if row is None else Progress(row[0], row[1], row[2], bytes(row[3]))
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        rows = [(token, at, *progress) for token, (at, progress) in pending.items()]
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "INSERT INTO progress (token, updated_at, instrument, page, question_index, answers) "
+                    "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(token) DO UPDATE SET "
+                    "updated_at = excluded.updated_at, instrument = excluded.instrument, page = excluded.page, "
+                    "question_index = excluded.question_index, answers = excluded.answers",
+                    rows,
+                )
+        except sqlite3.Error:
+            logger.exception("failed to write %d progress rows to %s", len(rows), self.path)
+
+    def prune(self, now=None):
+        """Delete checkpoints not updated for ttl seconds."""
+        cutoff = (time.time() if now is None else now) - self.ttl
+        try:
+            with closing(self._connect()) as conn, conn:
+                return conn.execute("DELETE FROM progress WHERE updated_at < ?", (cutoff,)).rowcount
+        except sqlite3.Error:
+            logger.exception("failed to prune progress in %s", self.path)
+            return 0
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(5.0)
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
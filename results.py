@@ -0,0 +1,101 @@
+"""Results page content, cached per score and norm.
+
+The headline and the chart depend only on the instrument, the total score, how
+many items an adaptive quiz asked, the norm version (which names the cohort
+for cohort norms) and the chart kind. build_view() computes them once, and
+VIEWS keeps the most recently used views (INTHUM_RESULTS_CACHE_SIZE, default
+1024) in a process-wide LRU cache, so a reload or a shared results link costs
+a dict lookup. The percentile and the norm's size are not part of the version
+(a live norm keeps growing under the same one), so compare() works them out on
+every render from the precomputed percentile table.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
+
+import charts
+from scoring import percentile_table, percentile_tier
+
+
+class ResultsView(NamedTuple):
+    total: int
+    headline: str
+    caption: str
+    chart: object  # SVG markup, or a Plotly figure
+
+
+class Comparison(NamedTuple):
+    percentile: float
+    tier: str
+    norm_text: str
+
+
+class LRUCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+
+VIEWS = LRUCache(int(os.environ.get("INTHUM_RESULTS_CACHE_SIZE", "1024")))
+
+
+def view_key(instrument, total, norm, chart_kind, asked=None):
+    return instrument.id, total, asked, norm.version, chart_kind
+
+
+def build_view(instrument, total, norm, chart_kind, asked=None):
+    """asked is the number of items an adaptive quiz asked, None for a full quiz."""
+    if asked is None:
+        headline = f"### Your score is {total} out of {instrument.max_score}"
+        caption = ""
+    else:
+        headline = f"### Your estimated score is {total} out of {instrument.max_score}"
+        caption = f"Estimated from your answers to {asked} of the {len(instrument.items)} statements."
+    if chart_kind == "svg":
+        chart = charts.results_svg(total, norm, instrument.construct)
+    else:
+        chart = charts.results_figure(total, norm, instrument.construct)
+    return ResultsView(total, headline, caption, chart)
+
+
+def compare(instrument, total, norm, percentile=None):
+    """Percentile, tier and norm description for total against norm.
+
+    percentile overrides the one derived from norm (cohort norms look it up
+    in their own table).
+    """
+    if percentile is None:
+        table = instrument.table if norm is instrument.norm else percentile_table(norm)
+        percentile = table.percentile(total)
+    if norm.is_live:
+        norm_text = f"The average score of {norm.mean:.2f} is based on the {norm.n:,} people who have taken this quiz."
+    elif norm.is_cohort:
+        norm_text = (
+            f"The average score of {norm.mean:.2f} is based on {norm.n:,} people in your comparison group "
+            f"({norm.source[len('cohort:'):]})."
+        )
+    else:
+        norm_text = (
+            f"The average score is based on the mean {instrument.construct.lower()} score of "
+            f"{norm.mean:g} reported by {instrument.reference}."
+        )
+    return Comparison(percentile, percentile_tier(percentile), norm_text)
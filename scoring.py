@@ -0,0 +1,56 @@
+"""Percentile scoring of questionnaire totals, usable without Streamlit.
+
+Every total is an integer in a small range (6 to 30 for the six-item scale),
+so the percentile of each possible total against a norm is computed once into
+a table and scoring a respondent is a single index into it. The items
+themselves are defined per instrument, see instruments.py; see bulk_score.py
+for scoring whole response files from the command line.
+"""
+from functools import lru_cache
+from typing import NamedTuple, Tuple
+
+from norms import MIN_SCORE, PUBLISHED_NORM
+
+TOP = "top"
+MIDDLE = "middle"
+BOTTOM = "bottom"
+
+
+class PercentileTable(NamedTuple):
+    # percentiles[total - min_score] is the percent of the norm group scoring
+    # below total, counting ties as half.
+    percentiles: Tuple[float, ...]
+    min_score: int = MIN_SCORE
+
+    @property
+    def max_score(self):
+        return self.min_score + len(self.percentiles) - 1
+
+    def percentile(self, total):
+        if not self.min_score <= total <= self.max_score:
+            raise ValueError(f"total score {total} is outside {self.min_score}-{self.max_score}")
+        return self.percentiles[total - self.min_score]
+
+    def tier(self, total):
+        return percentile_tier(self.percentile(total))
+
+
+def percentile_tier(percentile):
+    if percentile >= 75:
+        return TOP
+    if percentile <= 25:
+        return BOTTOM
+    return MIDDLE
+
+
+@lru_cache(maxsize=32)
+def percentile_table(norm=PUBLISHED_NORM):
+    totals = range(norm.min_score, norm.max_score + 1)
+    return PercentileTable(tuple(norm.percentile(total) for total in totals), norm.min_score)
+
+
+def score(answers, norm=PUBLISHED_NORM):
+    """Return (total, percentile, tier) for a list of 1-5 answers."""
+    total = sum(answers)
+    table = percentile_table(norm)
+    return total, table.percentile(total), table.tier(total)
@@ -0,0 +1,74 @@
+"""Start the Streamlit server after warming up the process.
+
+    python serve.py [streamlit run options...]
+
+Streamlit imports nothing and runs app.py only when the first browser
+connects, so that respondent pays for the imports, the instrument compile,
+the first results figure, the adaptive item bank tables and the cohort norm
+arrays. Here those happen
+before the server binds its port. /_stcore/health then answers only once the
+process is warm, which makes it usable as a readiness check. Everything is
+warmed in this process and kept in sys.modules and module-level caches that
+app.py shares, because Streamlit runs the script in the same interpreter. Set
+INTHUM_WARMUP=0 to skip it.
+"""
+import gc
+import logging
+import os
+import sys
+import time
+
+logger = logging.getLogger(__name__)
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+
+def warm_up():
+    import plotly.io
+    import plotly.tools  # noqa: F401 (imported by st.plotly_chart)
+    import streamlit  # noqa: F401
+
+    import cat
+    import charts
+    import cohorts
+    import instruments
+
+    # Published norms only: a live norm is not known before the first session.
+    for instrument_id in instruments.available():
+        try:
+            instrument = instruments.get(instrument_id)
+        except (KeyError, instruments.InvalidInstrument):
+            logger.exception("skipping instrument %s", instrument_id)
+            continue
+        for kind in ("svg", "plotly"):
+            charts.prerender(instrument.norm, instrument.construct, kind)
+        if instrument.irt is not None:
+            cat.item_bank(instrument.irt, len(instrument.scale))
+        try:
+            cohorts.get(instrument)
+        except (OSError, cohorts.InvalidCohortTable):
+            logger.exception("skipping cohort norms of %s", instrument_id)
+    # The first serialization initializes plotly's JSON encoder.
+    default = instruments.get()
+    plotly.io.to_json(charts.results_figure(default.max_score, default.norm, default.construct), validate=False)
+
+    # Everything built so far lives as long as the process; keep it out of
+    # the full collections triggered by later script runs.
+    gc.collect()
+    gc.freeze()
+
+
+def main():
+    if os.environ.get("INTHUM_WARMUP", "1") != "0":
+        start = time.perf_counter()
+        warm_up()
+        print(f"warm-up finished in {time.perf_counter() - start:.2f} s", file=sys.stderr)
+
+    from streamlit.web import cli
+
+    sys.argv = ["streamlit", "run", APP_PATH, *sys.argv[1:]]
+    sys.exit(cli.main())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Process-wide bookkeeping of sessions and idle-session eviction.
+
+Sessions are kept in least-recently-used order, so finding idle or
+least-recently-used sessions only looks at the old end of the list. A
+background sweeper applies the eviction policy: a TTL after the last
+interaction, a cap on resident sessions, and an optional RSS high-water mark.
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+
+logger = logging.getLogger(__name__)
+
+# Set in an evicted session's state so the app can explain the restart.
+EVICTED_KEY = "evicted"
+
+
+class SessionTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_seen = OrderedDict()
+
+    def __len__(self):
+        return len(self._last_seen)
+
+    def touch(self, session_id, now=None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self._last_seen[session_id] = now
+            self._last_seen.move_to_end(session_id)
+
+    def forget(self, session_id):
+        with self._lock:
+            self._last_seen.pop(session_id, None)
+
+    def active(self, window, now=None):
+        """Number of sessions with a script run in the last window seconds."""
+        cutoff = (time.monotonic() if now is None else now) - window
+        count = 0
+        with self._lock:
+            for last_seen in reversed(self._last_seen.values()):
+                if last_seen < cutoff:
+                    break
+                count += 1
+        return count
+
+    def pop_idle(self, ttl, now=None):
+        """Remove and return the sessions idle for longer than ttl seconds."""
+        cutoff = (time.monotonic() if now is None else now) - ttl
+        idle = []
+        with self._lock:
+            while self._last_seen:
+                session_id, last_seen = next(iter(self._last_seen.items()))
+                if last_seen >= cutoff:
+                    break
+                del self._last_seen[session_id]
+                idle.append(session_id)
+        return idle
+
+    def pop_oldest(self, count):
+        """Remove and return up to count least-recently-used sessions."""
+        oldest = []
+        with self._lock:
+            while self._last_seen and len(oldest) < count:
+                oldest.append(self._last_seen.popitem(last=False)[0])
+        return oldest
+
+
+class EvictionPolicy(NamedTuple):
+    ttl: float = 1800.0          # seconds since the last interaction, 0 = off
+    max_sessions: int = 0        # resident sessions kept, 0 = unlimited
+    max_rss_mb: float = 0.0      # evict above this resident set size, 0 = off
+    rss_evict_fraction: float = 0.1
+    interval: float = 30.0
+
+    @classmethod
+    def from_env(cls, environ=os.environ):
+        return cls(
+            ttl=float(environ.get("INTHUM_SESSION_TTL", cls._field_defaults["ttl"])),
+            max_sessions=int(environ.get("INTHUM_MAX_SESSIONS", cls._field_defaults["max_sessions"])),
+            max_rss_mb=float(environ.get("INTHUM_MAX_RSS_MB", cls._field_defaults["max_rss_mb"])),
+            interval=float(environ.get("INTHUM_EVICTION_INTERVAL", cls._field_defaults["interval"])),
+        )
+
+    @property
+    def enabled(self):
+        return bool(self.ttl or self.max_sessions or self.max_rss_mb)
+
+
+def current_rss_mb():
+    try:
+        with open("/proc/self/statm") as fh:
+            pages = int(fh.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
+
+def sweep(tracker, policy, evict, now=None):
+    """Apply policy once; returns {reason: number of sessions evicted}."""
+    evicted = {}
+
+    def run(reason, session_ids):
+        for session_id in session_ids:
+            evict(session_id)
+        if session_ids:
+            evicted[reason] = len(session_ids)
+
+    if policy.ttl:
+        run("ttl", tracker.pop_idle(policy.ttl, now))
+    if policy.max_sessions and len(tracker) > policy.max_sessions:
+        run("lru", tracker.pop_oldest(len(tracker) - policy.max_sessions))
+    if policy.max_rss_mb:
+        rss = current_rss_mb()
+        if rss is not None and rss > policy.max_rss_mb:
+            # RSS only falls once the allocator returns memory, so evict a
+            # slice per sweep rather than everything at once.
+            run("rss", tracker.pop_oldest(max(1, int(len(tracker) * policy.rss_evict_fraction))))
+    return evicted
+
+
+def evict_streamlit_session(session_id):
+    """Free a session's state; disconnected sessions are closed outright.
+
+    A connected browser keeps its websocket: its session state is cleared and
+    marked with EVICTED_KEY, so its next interaction starts from the intro
+    page. Uses the Streamlit runtime's session manager, which has no public
+    API for this.
+    """
+    from streamlit.runtime import Runtime
+
+    if not Runtime.exists():
+        return
+    session_mgr = Runtime.instance()._session_mgr
+    if not session_mgr.is_active_session(session_id):
+        session_mgr.close_session(session_id)
+        return
+    info = session_mgr.get_session_info(session_id)
+    if info is None:
+        return
+    state = info.session.session_state
+    state.clear()
+    state[EVICTED_KEY] = True
+
+
+def start_sweeper(tracker, policy, evict=evict_streamlit_session, on_sweep=None):
+    """Run sweep() every policy.interval seconds on a daemon thread."""
+    def loop():
+        while True:
+            time.sleep(policy.interval)
+            try:
+                evicted = sweep(tracker, policy, evict)
+                if on_sweep is not None:
+                    on_sweep(evicted)
+            except Exception:
+                logger.exception("idle-session sweep failed")
+
+    thread = threading.Thread(target=loop, name="session-sweeper", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,30 @@
+// Loaded once into the Streamlit page by app.page_assets(); later reruns only
+// call into window.inthum instead of re-sending this script.
+(function () {
+  if (window.inthum) {
+    return;
+  }
+
+  function scrollWindowToTop() {
+    window.scrollTo({ top: 0, left: 0, behavior: "auto" });
+  }
+
+  function scrollToTop() {
+    setTimeout(function () {
+      var container = document.querySelector(".stMainBlockContainer");
+      if (container) {
+        // Use scrollIntoView with block: 'start', then force scroll to top as a fallback
+        container.scrollIntoView({ behavior: "auto", block: "start" });
+        setTimeout(scrollWindowToTop, 10);
+      } else {
+        scrollWindowToTop();
+      }
+    }, 10);
+  }
+
+  if ("scrollRestoration" in history) {
+    history.scrollRestoration = "manual";
+  }
+
+  window.inthum = { scrollToTop: scrollToTop };
+})();
@@ -0,0 +1,114 @@
+"""Background persistence of submitted responses.
+
+Submissions are handed to a queue from the script thread and written by a
+single worker thread, which groups them into batched transactions in a local
+SQLite database running in WAL mode. Nothing on the request path touches the
+disk.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    id INTEGER PRIMARY KEY,
+    submitted_at REAL NOT NULL,
+    instrument TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    total INTEGER NOT NULL
+)
+"""
+
+_STOP = object()
+
+
+class ResponseWriter:
+    """Queue submissions and flush them to SQLite on size or time thresholds."""
+
+    def __init__(self, path, batch_size=200, flush_interval=1.0, max_queue=50_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="response-writer", daemon=True)
+        self._closed = False
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, answers, instrument="ihs6", submitted_at=None, total=None):
+        record = (
+            submitted_at or time.time(),
+            instrument,
+            json.dumps(list(answers)),
+            sum(answers) if total is None else total,
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            # Never block the script thread; losing a row beats stalling every session.
+            self.dropped += 1
+            logger.warning("response queue full, dropped a submission (%d so far)", self.dropped)
+            return False
+        return True
+
+    def close(self, timeout=10.0):
+        """Flush everything still queued and stop the worker."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(SCHEMA)
+        conn.commit()
+        return conn
+
+    def _write(self, conn, batch):
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO responses (submitted_at, instrument, answers, total) VALUES (?, ?, ?, ?)",
+                    batch,
+                )
+            self.written += len(batch)
+        except sqlite3.Error:
+            logger.exception("failed to write %d responses to %s", len(batch), self.path)
+
+    def _run(self):
+        conn = self._connect()
+        batch = []
+        deadline = None
+        stopping = False
+        while not stopping:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            if item is _STOP:
+                stopping = True
+            elif item is not None:
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(conn, batch)
+                batch = []
+                deadline = None
+        conn.close()
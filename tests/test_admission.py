@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import admission as admission_module  # noqa: E402
+from admission import AdmissionController, AdmissionPolicy  # noqa: E402
+
+
+def controller(**policy):
+    return AdmissionController(AdmissionPolicy(**{"max_running": 1, "max_waiting": 1, "wait": 0.0, **policy}))
+
+
+def test_admits_up_to_max_running():
+    admission = controller(max_running=2)
+    assert admission.acquire("a").admitted
+    assert admission.acquire("b").admitted
+    assert admission.running == 2
+    admission.release()
+    assert admission.running == 1
+
+
+def test_queued_session_is_admitted_after_release():
+    admission = controller()
+    assert admission.acquire("a").admitted
+    queued = admission.acquire("b")
+    assert not queued.admitted and queued.position == 0
+    assert admission.poll("b") == (0, False)
+    admission.release()
+    assert admission.poll("b") == (0, True)
+    assert admission.acquire("b").admitted
+
+
+def test_full_line_polls_without_rerunning():
+    admission = controller()
+    assert admission.acquire("a").admitted
+    assert admission.acquire("b").position == 0
+    turned_away = admission.acquire("c")
+    assert not turned_away.admitted and turned_away.position is None
+    # Not ready while the line is still full, so the waiting view keeps polling.
+    assert admission.poll("c") == (None, False)
+    assert not admission.acquire("c").admitted
+
+    # Once there is room, the next poll puts the session in line.
+    admission.release()
+    assert admission.acquire("b").admitted
+    assert admission.poll("c") == (0, False)
+    admission.release()
+    assert admission.poll("c") == (0, True)
+    assert admission.acquire("c").admitted
+
+
+def test_session_dropped_from_line_rejoins_on_poll():
+    # With stale=0 every entry has expired by the next call.
+    admission = controller(stale=0.0)
+    assert admission.acquire("a").admitted
+    assert admission.acquire("b").position == 0
+    assert admission.poll("b") == (0, False)
+    admission.release()
+    assert admission.poll("b") == (None, True)
+    assert admission.acquire("b").admitted
+
+
+def test_protected_session_skips_the_line():
+    admission = controller()
+    assert admission.acquire("a").admitted
+    assert admission.acquire("b").position == 0
+    result = []
+    thread = threading.Thread(target=lambda: result.append(admission.acquire("c", protected=True)))
+    thread.start()
+    admission.release()
+    thread.join(5)
+    assert result and result[0].admitted
+    assert admission.poll("b") == (0, False)
+
+
+def test_blocked_session_is_not_expired(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(admission_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    admission = controller(max_waiting=2, wait=30.0, stale=20.0)
+    assert admission.acquire("a").admitted
+    result = []
+    thread = threading.Thread(target=lambda: result.append(admission.acquire("b")))
+    thread.start()
+    # acquire() holds the lock from joining the line until it waits.
+    while admission.waiting == 0:
+        time.sleep(0.001)
+
+    # b has been blocked longer than stale when another session checks the line.
+    now[0] = 25.0
+    assert admission.poll("c") == (1, False)
+    admission.release()
+    thread.join(5)
+    assert result and result[0].admitted
+
+
+def test_wait_is_clamped_below_stale():
+    policy = AdmissionPolicy.from_env({"INTHUM_MAX_RUNNING": "1", "INTHUM_ADMISSION_WAIT": "60"})
+    assert policy.wait < policy.stale
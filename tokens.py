@@ -0,0 +1,65 @@
+"""Signed, URL-safe tokens that carry a respondent's answers.
+
+A token is base64url(len(id) | instrument id | one byte per answer | MAC),
+where the MAC is a truncated HMAC-SHA256 under a server secret. For the
+six-item scale that is 27 characters, short enough for a query parameter, and
+a results page can be rebuilt from it without any session state. Tokens only
+prove that this server issued them; they are not encrypted.
+"""
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+
+MAC_BYTES = 9
+
+
+def load_secret(path):
+    """Read the secret at path, creating it (shared by all workers) if missing."""
+    try:
+        with open(path, "rb") as fh:
+            return fh.read()
+    except FileNotFoundError:
+        pass
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "wb") as fh:
+        fh.write(secrets.token_bytes(32))
+    try:
+        # link() fails if another process created the secret first; theirs wins.
+        os.link(tmp_path, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp_path)
+    with open(path, "rb") as fh:
+        return fh.read()
+
+
+def _mac(secret, payload):
+    return hmac.new(secret, payload, hashlib.sha256).digest()[:MAC_BYTES]
+
+
+def encode(instrument_id, answers, secret):
+    name = instrument_id.encode()
+    payload = bytes([len(name)]) + name + bytes(answers)
+    return base64.urlsafe_b64encode(payload + _mac(secret, payload)).rstrip(b"=").decode()
+
+
+def decode(token, secret):
+    """Return (instrument id, answers tuple), or None if token is malformed or forged."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+    except (ValueError, TypeError):
+        return None
+    payload, mac = raw[:-MAC_BYTES], raw[-MAC_BYTES:]
+    if len(payload) < 2 or not hmac.compare_digest(mac, _mac(secret, payload)):
+        return None
+    length = payload[0]
+    try:
+        instrument_id = payload[1:1 + length].decode()
+    except UnicodeDecodeError:
+        return None
+    return instrument_id, tuple(payload[1 + length:])